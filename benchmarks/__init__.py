@@ -0,0 +1,3 @@
+# Headless benchmark suite for the game's hot paths.
+#   python -m benchmarks                 run and compare with benchmarks/baseline.json
+#   python -m benchmarks --save          store the results as the new baseline
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import argparse
+import time
+
+# run without a window; must be set before pygame is imported
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+from .cases import cases, frameCases, newGame
+from files.render import backends
+
+defaultBaseline = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def baselinePath(renderer):
+    # each backend is compared against its own numbers
+    if renderer == "surface":
+        return defaultBaseline
+    return os.path.join(os.path.dirname(__file__), f"baseline-{renderer}.json")
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def measure(setup, repeat, renderer="surface"):
+    step, samples = setup(newGame(renderer))
+    samples = max(1, int(samples * repeat))
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        step()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50": percentile(times, 0.50),
+        "p90": percentile(times, 0.90),
+        "p99": percentile(times, 0.99),
+        "mean": sum(times) / len(times),
+        "samples": len(times),
+    }
+
+def compare(results, baseline, threshold, metric):
+    # a case regresses when its metric grew by more than `threshold` (0.25 = 25%)
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous or not previous[metric]:
+            continue
+        change = result[metric] / previous[metric] - 1
+        if change > threshold:
+            regressions.append((name, previous[metric], result[metric], change))
+    return regressions
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Time the game's hot paths headlessly.")
+    parser.add_argument("--baseline", help="baseline JSON file (default: benchmarks/baseline.json, "
+                                           "baseline-<renderer>.json for other renderers)")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--metric", choices=("p50", "p90", "p99", "mean"), default="p50")
+    parser.add_argument("--repeat", type=float, default=1.0, help="scale the number of samples")
+    parser.add_argument("--only", nargs="*", choices=sorted(cases), help="cases to run")
+    parser.add_argument("--renderer", choices=backends, default="surface", help="render backend to time")
+    parser.add_argument("--compare-renderers", action="store_true",
+                        help="time the drawing cases with every backend side by side (no baseline)")
+    return parser.parse_args(argv)
+
+def compareRenderers(args):
+    print(f"{'p50 ms':<18}" + "".join(f"{renderer:>10}" for renderer in backends))
+    for name in args.only or frameCases:
+        times = [measure(cases[name], args.repeat, renderer)["p50"] for renderer in backends]
+        print(f"{name:<18}" + "".join(f"{time:>10.3f}" for time in times))
+
+def main(argv=None):
+    args = parseArgs(argv)
+    pygame.init()
+    if args.compare_renderers:
+        compareRenderers(args)
+        pygame.quit()
+        return 0
+    args.baseline = args.baseline or baselinePath(args.renderer)
+
+    results = {}
+    print(f"{'case':<18}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    for name in args.only or cases:
+        results[name] = measure(cases[name], args.repeat, args.renderer)
+        result = results[name]
+        print(f"{name:<18}{result['p50']:>10.3f}{result['p90']:>10.3f}"
+              f"{result['p99']:>10.3f}{result['mean']:>10.3f}")
+    pygame.quit()
+
+    if args.save:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # nothing to compare against is a failure, not a pass
+        print(f"no baseline at {args.baseline}; run with --save to create one")
+        return 1
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.threshold, args.metric)
+    for name, before, after, change in regressions:
+        print(f"REGRESSION {name}: {args.metric} {before:.3f} ms -> {after:.3f} ms (+{change:.0%})")
+    if regressions:
+        return 1
+    print(f"no regressions beyond {args.threshold:.0%} ({args.metric})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+import random
+import pygame
+from files.game import SolitaireGame
+from files.engine import Engine, encodeCard
+from files.savegame import SaveData
+
+# --------------------benchmark cases---------------------#
+# each case takes a fresh game and returns (step, samples): `step` is timed once per sample
+def newGame(renderer="surface"):
+    game = SolitaireGame(dealNumber=1, backgroundAssets=False, renderer=renderer)
+    # never sleep in clock.tick while measuring
+    game.frameRate = 0
+    game.dragFrameRate = 0
+    game.idleWait = False
+    return game
+
+def playRandomMoves(game, count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        game.play_move(rng.choice(game.engine.legal_moves()))
+
+def benchInit(game):
+    return SolitaireGame, 20
+
+def benchSetup(game):
+    return game.setup_game, 100
+
+def benchFullFrame(game):
+    def step():
+        game.renderer.invalidate()
+        game.run_frame()
+    return step, 200
+
+def benchIdleFrame(game):
+    game.run_frame()
+    return game.run_frame, 1000
+
+def benchStatusBar(game):
+    return game.draw_status_bar, 1000
+
+def benchDrag(game):
+    # pick up the top card of a tableau pile, drag it away and back, drop it:
+    # the drop is refused, so every sample starts from the same table
+    card = game.piles[3].pile[-1]
+    start = (card.rect.x + 10, card.rect.y + 10)
+    away = (start[0] + 150, start[1] + 80)
+    events = [
+        pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=start, button=1),
+        pygame.event.Event(pygame.MOUSEMOTION, pos=away, rel=(150, 80), buttons=(1, 0, 0)),
+        pygame.event.Event(pygame.MOUSEMOTION, pos=start, rel=(-150, -80), buttons=(1, 0, 0)),
+        pygame.event.Event(pygame.MOUSEBUTTONUP, pos=start, button=1),
+    ]
+
+    def step():
+        for event in events:
+            pygame.event.post(event)
+        game.handle_events()
+    return step, 500
+
+def benchDragFrame(game):
+    # one rendered frame while the longest tableau run is held and moved
+    pile = max(game.piles, key=lambda pile: len(pile.pile) - sum(not card.faceUp for card in pile.pile))
+    first = next(index for index, card in enumerate(pile.pile) if card.faceUp)
+    card = pile.pile[first]
+    start = (card.rect.x + 10, card.rect.y + 10)
+    pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=start, button=1))
+    game.run_frame()
+    offsets = [(x, 40) for x in range(0, 400, 4)]
+    moves = [pygame.event.Event(pygame.MOUSEMOTION, pos=(start[0] + dx, start[1] + dy), rel=(4, 0),
+                                buttons=(1, 0, 0)) for dx, dy in offsets]
+    position = [0]
+
+    def step():
+        pygame.event.post(moves[position[0] % len(moves)])
+        position[0] += 1
+        game.run_frame()
+    return step, 500
+
+def benchUndoRedo(game):
+    playRandomMoves(game, 1000)
+
+    def step():
+        for _ in range(1000):
+            game.undo()
+        for _ in range(1000):
+            game.redo()
+    return step, 20
+
+def benchAutoComplete(game):
+    # four face-up King-to-Ace runs on the tableau: all 52 cards go up as one batch
+    engine = Engine()
+    for pile, (black, red) in enumerate((("spades", "hearts"), ("hearts", "spades"),
+                                        ("clubs", "diamonds"), ("diamonds", "clubs"))):
+        engine.piles[pile].extend(encodeCard(number, black if number % 2 else red)
+                                  for number in range(13, 0, -1))
+    game.resume_game(SaveData(engine, None, 0, 0.0, [], []))
+    game.fastForward = False
+
+    def step():
+        game.auto_complete()
+        game.undo()
+    return step, 200
+
+cases = {
+    "init": benchInit,
+    "setup_game": benchSetup,
+    "run_frame_full": benchFullFrame,
+    "run_frame_idle": benchIdleFrame,
+    "draw_status_bar": benchStatusBar,
+    "drag": benchDrag,
+    "drag_frame": benchDragFrame,
+    "undo_redo_1000": benchUndoRedo,
+    "auto_complete": benchAutoComplete,
+}
+
+# the cases that draw, timed for each backend by --compare-renderers
+frameCases = ("run_frame_full", "run_frame_idle", "drag_frame")
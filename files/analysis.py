@@ -0,0 +1,129 @@
+import multiprocessing
+import queue
+import random
+import time
+from .playout import playoutMoves, randomPlayout
+
+# --------------------background Monte Carlo analysis---------------------#
+# A worker process plays random playouts from every candidate move of the
+# position it was last sent and streams running totals back, so the game can
+# show win odds without ever waiting on it. Each position carries a
+# generation number; a newer position cancels the current one and results
+# for older generations are dropped on arrival.
+
+class AnalysisResult:
+    def __init__(self, generation, moves, wins, playouts, elapsed, done):
+        self.generation = generation
+        self.moves = moves
+        self.wins = wins
+        self.playouts = playouts
+        self.elapsed = elapsed
+        # True once the time budget is used up (no further updates follow)
+        self.done = done
+
+    def winRate(self, index):
+        return self.wins[index] / self.playouts[index] if self.playouts[index] else 0.0
+
+    def best(self):
+        """Index of the move with the highest estimated win rate (None without moves)."""
+        if not self.moves:
+            return None
+        return max(range(len(self.moves)), key=self.winRate)
+
+    def winProbability(self):
+        # the odds with best play are those of the best move
+        best = self.best()
+        return 0.0 if best is None else self.winRate(best)
+
+    def deadEnd(self, minimumPlayouts=200):
+        """Likely lost: no legal move, or not a single win in enough playouts."""
+        return not self.moves or (sum(self.playouts) >= minimumPlayouts and not any(self.wins))
+
+def analyze(engine, generation, requests, results, budget, interval, maxMoves):
+    # playouts round-robin over the moves; returns a newer request if one cancels this one
+    moves = playoutMoves(engine)
+    wins = [0] * len(moves)
+    playouts = [0] * len(moves)
+    rng = random.Random(generation)
+    started = time.perf_counter()
+    lastSent = started
+    while True:
+        now = time.perf_counter()
+        done = not moves or now - started >= budget
+        if done or now - lastSent >= interval:
+            lastSent = now
+            results.put(AnalysisResult(generation, moves, list(wins), list(playouts), now - started, done))
+        if done:
+            return None
+        try:
+            return requests.get_nowait()
+        except queue.Empty:
+            pass
+        for index, move in enumerate(moves):
+            position = engine.copy()
+            position.apply(move)
+            won, _ = randomPlayout(position, rng, maxMoves)
+            wins[index] += won
+            playouts[index] += 1
+
+def analysisLoop(requests, results, budget, interval, maxMoves):
+    request = None
+    while True:
+        if request is None:
+            request = requests.get()
+        # only the newest position matters
+        try:
+            while True:
+                request = requests.get_nowait()
+        except queue.Empty:
+            pass
+        if request == "stop":
+            return
+        generation, engine = request
+        request = analyze(engine, generation, requests, results, budget, interval, maxMoves)
+
+class AnalysisWorker:
+    def __init__(self, budget=5.0, interval=0.2, maxMoves=400):
+        # spawn rather than fork: the worker starts without the game's threads,
+        # window or open files (it still re-imports the main module, so
+        # pygame is loaded when the game is started as `python main.py`)
+        context = multiprocessing.get_context("spawn")
+        self.requests = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(target=analysisLoop, name="analysis", daemon=True,
+                                       args=(self.requests, self.results, budget, interval, maxMoves))
+        self.process.start()
+        self.interval = interval
+        self.generation = 0
+        self.result = None
+
+    @property
+    def busy(self):
+        # a position is being analysed and more results are coming
+        return self.result is None or (self.result.generation == self.generation and not self.result.done)
+
+    def submit(self, engine):
+        """Analyse a new position; anything still running for the old one is cancelled."""
+        self.generation += 1
+        self.result = None
+        self.requests.put((self.generation, engine.copy()))
+
+    def poll(self):
+        """Newest result for the current position, without blocking (None if nothing new)."""
+        latest = None
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if result.generation == self.generation:
+                latest = result
+        if latest is not None:
+            self.result = latest
+        return latest
+
+    def close(self):
+        self.requests.put("stop")
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
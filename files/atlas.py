@@ -0,0 +1,90 @@
+import os
+import pygame
+from .utils import convertImage, cacheImage, fullPath, readImage
+from .cards import Card
+from .buttons import Button
+
+# --------------------pre-baked sprite atlas---------------------#
+# All card faces, the card back, the empty slot and the button icons are
+# packed into a single PNG so the game can fill the sprite cache with one read.
+# Build it with:  python -m files.atlas
+# A manifest next to it lists every source image with its size and
+# modification time; the atlas is ignored once any of them changes.
+atlasPath = f"{Card.imagePath}/atlas.png"
+columns = 13
+# result of loadAtlas per path: the atlas is read at most once per process
+loadedAtlases = {}
+
+def atlasEntries():
+    # fixed order defines the layout, so no separate index file is needed
+    entries = [(f"{Card.imagePath}/{number}_of_{suit}.png", Card.size)
+               for suit in Card.suits for number in range(1, 14)]
+    entries.append((f"{Card.imagePath}/playingCardBack.png", Card.size))
+    entries.append((f"{Card.imagePath}/empty_pile_slot.png", Card.size))
+    for icon in ("reset", "undo", "redo"):
+        entries.append((f"{Card.imagePath}/icons8-{icon}-16.png", Button.iconSize))
+    return entries
+
+def atlasSize(entries):
+    rows = (len(entries) + columns - 1) // columns
+    return Card.size[0] * columns, Card.size[1] * rows
+
+def cellPosition(index):
+    return (index % columns) * Card.size[0], (index // columns) * Card.size[1]
+
+def manifestPath(path):
+    return f"{path}.manifest"
+
+def buildManifest(entries):
+    # one line per source image: path, size and modification time
+    lines = []
+    for imagePath, (width, height) in entries:
+        lines.append(f"{imagePath} {width} {height} {os.stat(fullPath(imagePath)).st_mtime_ns}")
+    return "\n".join(lines) + "\n"
+
+def readManifest(path):
+    try:
+        with open(fullPath(manifestPath(path))) as file:
+            return file.read()
+    except OSError:
+        return None
+
+def buildAtlas(path=atlasPath):
+    entries = atlasEntries()
+    atlas = pygame.Surface(atlasSize(entries), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    for index, (imagePath, size) in enumerate(entries):
+        atlas.blit(readImage(imagePath, size), cellPosition(index))
+    pygame.image.save(atlas, fullPath(path))
+    with open(fullPath(manifestPath(path)), "w") as file:
+        file.write(buildManifest(entries))
+    loadedAtlases.pop(path, None)
+    return len(entries)
+
+def loadAtlas(path=atlasPath):
+    """Fill the sprite cache from the atlas, once per process. Returns False if there is no usable atlas."""
+    if path not in loadedAtlases:
+        loadedAtlases[path] = readAtlas(path)
+    return loadedAtlases[path]
+
+def readAtlas(path):
+    if not os.path.exists(fullPath(path)):
+        return False
+    entries = atlasEntries()
+    # a stale atlas (other layout, or a source image changed since) is ignored
+    try:
+        if readManifest(path) != buildManifest(entries):
+            return False
+    except OSError:
+        return False
+    atlas = pygame.image.load(fullPath(path))
+    if atlas.get_size() != atlasSize(entries):
+        return False
+    atlas = convertImage(atlas)
+    for index, (imagePath, size) in enumerate(entries):
+        cacheImage(imagePath, size, atlas.subsurface(pygame.Rect(cellPosition(index), size)))
+    return True
+
+
+if __name__ == '__main__':
+    print(f"Packed {buildAtlas()} sprites into {atlasPath}")
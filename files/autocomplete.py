@@ -0,0 +1,49 @@
+from .history import Move
+from .engine import tableauPiles, foundationPiles, stockIndex, wasteIndex, cardNumbers, cardSuits
+from .solver import foundationRanks
+
+# --------------------auto-complete planner---------------------#
+def canAutoComplete(engine):
+    """True when the game is won in all but name: stock and waste empty and
+    every tableau card face up, so the foundations can simply be filled."""
+    piles = engine.piles
+    if piles[stockIndex] or piles[wasteIndex] or engine.isWon():
+        return False
+    return not any(engine.hidden[pile] for pile in tableauPiles)
+
+def planFoundationMoves(engine):
+    """Foundation moves to play in order, planned in one pass on a copy of `engine`.
+
+    Every card that fits goes up, which finishes any position canAutoComplete accepts.
+    """
+    engine = engine.copy()
+    piles = engine.piles
+    ranks = foundationRanks(engine)
+    # foundation of each suit, or None until its ace goes up
+    homes = [None] * 4
+    for f in foundationPiles:
+        if piles[f]:
+            homes[cardSuits[piles[f][0]]] = f
+    free = [f for f in foundationPiles if not piles[f]]
+
+    moves = []
+    progress = True
+    while progress:
+        progress = False
+        for source in tuple(tableauPiles) + (wasteIndex,):
+            pile = piles[source]
+            if not pile:
+                continue
+            card = pile[-1]
+            suit = cardSuits[card]
+            if cardNumbers[card] != ranks[suit] + 1:
+                continue
+            if homes[suit] is None:
+                homes[suit] = free.pop(0)
+            flipped = source in tableauPiles and len(pile) - 1 == engine.hidden[source] > 0
+            move = Move(source, homes[suit], 1, flipped)
+            engine.apply(move)
+            ranks[suit] += 1
+            moves.append(move)
+            progress = True
+    return moves
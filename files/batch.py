@@ -0,0 +1,107 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import random
+import sys
+import time
+from .engine import Engine, shuffledDeck
+from .solver import Solver, solved, unwinnable
+from .playout import randomPlayout
+
+# --------------------headless batch deal analyzer---------------------#
+# Spreads ranges of numbered deals over a process pool and streams one result
+# per deal to CSV or JSONL:
+#   python -m files.batch --start 0 --count 100000 --out deals.csv
+fields = ("deal", "winnable", "status", "solution_length", "nodes", "wins", "playouts", "time")
+
+def analyzeDeal(dealNumber, options):
+    start = time.perf_counter()
+    engine = Engine.deal(shuffledDeck(dealNumber))
+    result = dict.fromkeys(fields)
+    result["deal"] = dealNumber
+
+    if options["mode"] == "solve":
+        outcome = Solver(options["max_nodes"], options["time_limit"]).solve(engine)
+        result["status"] = outcome.status
+        result["nodes"] = outcome.nodes
+        if outcome.status == solved:
+            result["winnable"] = True
+            result["solution_length"] = len(outcome.moves)
+        elif outcome.status == unwinnable:
+            result["winnable"] = False
+    else:
+        rng = random.Random(dealNumber)
+        wins = sum(randomPlayout(engine.copy(), rng, options["max_moves"])[0]
+                   for _ in range(options["playouts"]))
+        result["wins"] = wins
+        result["playouts"] = options["playouts"]
+        result["winnable"] = True if wins else None
+
+    result["time"] = round(time.perf_counter() - start, 6)
+    return result
+
+def analyzeRange(task):
+    # one chunk of consecutive deals per pool task keeps IPC overhead low
+    first, last, options = task
+    return [analyzeDeal(dealNumber, options) for dealNumber in range(first, last)]
+
+def chunks(start, count, size, options):
+    for first in range(start, start + count, size):
+        yield first, min(first + size, start + count), options
+
+class ResultWriter:
+    def __init__(self, path):
+        self.file = sys.stdout if path == "-" else open(path, "w", newline="")
+        self.jsonl = path.endswith(".jsonl")
+        if not self.jsonl:
+            self.csv = csv.DictWriter(self.file, fieldnames=fields)
+            self.csv.writeheader()
+
+    def write(self, result):
+        if self.jsonl:
+            self.file.write(json.dumps(result) + "\n")
+        else:
+            self.csv.writerow(result)
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m files.batch",
+                                     description="Analyze numbered Klondike deals headlessly.")
+    parser.add_argument("--start", type=int, default=0, help="first deal number")
+    parser.add_argument("--count", type=int, default=1000, help="number of deals")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk", type=int, default=50, help="deals per pool task")
+    parser.add_argument("--mode", choices=("solve", "playout"), default="solve")
+    parser.add_argument("--max-nodes", type=int, default=200000)
+    parser.add_argument("--time-limit", type=float, default=10.0, help="seconds per deal")
+    parser.add_argument("--playouts", type=int, default=100, help="random playouts per deal")
+    parser.add_argument("--max-moves", type=int, default=1000, help="moves per playout")
+    parser.add_argument("--out", default="-", help=".csv or .jsonl file (default: CSV on stdout)")
+    return parser.parse_args(argv)
+
+def runBatch(args):
+    options = {"mode": args.mode, "max_nodes": args.max_nodes, "time_limit": args.time_limit,
+               "playouts": args.playouts, "max_moves": args.max_moves}
+    tasks = chunks(args.start, args.count, args.chunk, options)
+    writer = ResultWriter(args.out)
+    started = time.perf_counter()
+    done = 0
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for results in pool.imap_unordered(analyzeRange, tasks):
+                for result in results:
+                    writer.write(result)
+                done += len(results)
+                writer.file.flush()
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - started
+    print(f"{done} deals in {elapsed:.1f}s ({done / elapsed:.1f} deals/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    runBatch(parseArgs())
@@ -1,34 +1,48 @@
 import pygame
-from .utils import loadImage
+from .utils import getImage
 from .cards import Card
 
 # Parent Button class
 class Button:
+    iconSize = (60, 40)
+
     def __init__(self, imagePath, size, posX, posY):
-        self.image = loadImage(imagePath, size)
-        self.rect = self.image.get_rect()
-        self.rect.x = posX
-        self.rect.y = posY
+        self.imagePath = imagePath
+        self.size = tuple(size)
+        self.rect = pygame.Rect((posX, posY), self.size)
+
+    @property
+    def image(self):
+        # None for text-only buttons
+        if self.imagePath is None:
+            return None
+        return getImage(self.imagePath, self.size, (0, 0, 0, 0))
 
     # Return true if pressed
-    def handleMouseDown(self):
-        mouseX, mouseY = pygame.mouse.get_pos()
+    def handleMouseDown(self, mousePos=None):
+        mouseX, mouseY = mousePos or pygame.mouse.get_pos()
         return self.rect.collidepoint(mouseX, mouseY)
 
     def draw(self, screen):
-        screen.blit(self.image, self.rect)
+        if self.image is not None:
+            screen.blit(self.image, self.rect)
 
 # Reset button inheriting from Button
 class ResetButton(Button):
     def __init__(self, posX, posY):
-        super().__init__(f"{Card.imagePath}/icons8-reset-16.png", (60, 40), posX, posY)
+        super().__init__(f"{Card.imagePath}/icons8-reset-16.png", Button.iconSize, posX, posY)
 
 # Undo button inheriting from Button
 class UndoButton(Button):
     def __init__(self, posX, posY):
-        super().__init__(f"{Card.imagePath}/icons8-undo-16.png", (60, 40), posX, posY)
+        super().__init__(f"{Card.imagePath}/icons8-undo-16.png", Button.iconSize, posX, posY)
+
+# Hint button (label only, no icon) inheriting from Button
+class HintButton(Button):
+    def __init__(self, posX, posY):
+        super().__init__(None, (Button.iconSize[0], Button.iconSize[1] + 20), posX, posY)
 
 # Redo button inheriting from Button
 class RedoButton(Button):
     def __init__(self, posX, posY):
-        super().__init__(f"{Card.imagePath}/icons8-redo-16.png", (60, 40), posX, posY)
+        super().__init__(f"{Card.imagePath}/icons8-redo-16.png", Button.iconSize, posX, posY)
@@ -1,27 +1,35 @@
 import pygame
-from .utils import loadImage
+from .utils import imageCache, getImage, LazyImage
+from .engine import suits, encodeCard
 # --------------------creating card and pile classes---------------------#
 # card class containing image, position, and size data
 class Card:
+    # a game owns one set of 52 cards (cardSet) that every deal, undo and
+    # restore reuses, so instances are kept small: no per-instance __dict__,
+    # and the face and back surfaces are shared through the image cache
+    __slots__ = ("number", "suit", "colour", "id", "__faceUp", "facePath", "faceImage", "rect")
+
     # set global card attributes
     size = width, height = 95, 125
     imagePath = "assets"
-    suits = ("clubs", "diamonds", "hearts", "spades")
+    suits = suits
 
-    # set cardback image
-    cardbackImage = loadImage(f"{imagePath}/playingCardBack.png", size)
+    # set cardback image (loaded on first use)
+    cardbackImage = LazyImage(f"{imagePath}/playingCardBack.png", size, (40, 70, 150))
 
     def __init__(self, number, suit, face_up=False):
         # set main card attributes
         self.number = number
         self.suit = suit
         self.colour = Card.getColour(suit)
+        # compact id used by the rules engine
+        self.id = encodeCard(number, suit)
 
-        # set image attributes
+        # set image attributes; the face is only looked up once the card is shown
         self.__faceUp = face_up
-        self.image = loadImage(f"{Card.imagePath}/{number}_of_{suit}.png", Card.size)
-        self.imageBuffer = self.image if face_up else Card.cardbackImage
-        self.rect = self.image.get_rect()
+        self.facePath = f"{Card.imagePath}/{number}_of_{suit}.png"
+        self.faceImage = None
+        self.rect = pygame.Rect((0, 0), Card.size)
 
     @staticmethod
     def getColour(suit):
@@ -29,6 +37,15 @@ class Card:
             return "black"
         return "red"
 
+    @property
+    def image(self):
+        # a placeholder is returned (and not kept) while the face is still loading
+        if self.faceImage is None:
+            self.faceImage = imageCache.get((self.facePath, Card.size))
+            if self.faceImage is None:
+                return getImage(self.facePath, Card.size)
+        return self.faceImage
+
     @property
     def faceUp(self):
         return self.__faceUp
@@ -36,11 +53,11 @@ class Card:
     @faceUp.setter
     def faceUp(self, faceUp):
         self.__faceUp = faceUp
-        # if set face up, change buffer image to card image
-        if self.__faceUp:
-            self.imageBuffer = self.image
-        else:
-            self.imageBuffer = Card.cardbackImage
+
+    @property
+    def imageBuffer(self):
+        # image currently shown: the face or the card back
+        return self.image if self.__faceUp else Card.cardbackImage
   
     def isOppositeColourTo(self, card):
         # return true if different colours
@@ -53,5 +70,9 @@ class Card:
     def draw(self, screen):
         screen.blit(self.imageBuffer, self.rect)
 
+def cardSet():
+    """The 52 cards of one game, in id order (cards[id] is the card with that id)."""
+    return tuple(Card(number, suit) for suit in suits for number in range(1, 14))
+
     
     
\ No newline at end of file
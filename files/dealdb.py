@@ -0,0 +1,155 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+from collections import namedtuple
+from .engine import shuffledDeck
+
+# --------------------memory-mapped database of winnable deals---------------------#
+# File layout: a 16-byte header followed by fixed-width 64-byte records, so
+# record i lives at a known offset and can be read straight from the mmap.
+# For each difficulty bucket a sidecar file ("<path>.b<bucket>") lists the
+# record numbers in that bucket as uint32s, which makes picking a deal of a
+# given difficulty O(1) as well.
+magic = b"SOLDEALS"
+version = 1
+header = struct.Struct("<8sII")             # magic, version, record size
+record = struct.Struct("<52sHBBII")         # deck order, solution length, difficulty, reserved, nodes, deal number
+noDealNumber = 0xFFFFFFFF
+
+# difficulty buckets by solver effort (nodes searched)
+difficultyNames = ("easy", "medium", "hard", "expert")
+difficultyLimits = (1000, 20000, 100000)
+
+DealRecord = namedtuple("DealRecord", "order solutionLength difficulty nodes dealNumber")
+
+def difficultyFor(nodes):
+    for bucket, limit in enumerate(difficultyLimits):
+        if nodes < limit:
+            return bucket
+    return len(difficultyLimits)
+
+def bucketPath(path, bucket):
+    return f"{path}.b{bucket}"
+
+def mapFile(path):
+    # read-only map of a whole file (None when missing or empty)
+    if not os.path.exists(path) or not os.path.getsize(path):
+        return None
+    with open(path, "rb") as file:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+class DealDatabase:
+    def __init__(self, path):
+        self.path = path
+        self.data = mapFile(path)
+        if self.data is not None:
+            fileMagic, fileVersion, recordSize = header.unpack_from(self.data, 0)
+            if fileMagic != magic or fileVersion != version or recordSize != record.size:
+                raise ValueError(f"{path} is not a version {version} deal database")
+        self.buckets = [mapFile(bucketPath(path, bucket)) for bucket in range(len(difficultyNames))]
+
+    def __len__(self):
+        if self.data is None:
+            return 0
+        return (len(self.data) - header.size) // record.size
+
+    def bucketSize(self, difficulty):
+        bucket = self.buckets[difficulty]
+        return 0 if bucket is None else len(bucket) // 4
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        order, length, difficulty, _, nodes, dealNumber = record.unpack_from(
+            self.data, header.size + index * record.size)
+        return DealRecord(list(order), length, difficulty, nodes,
+                          None if dealNumber == noDealNumber else dealNumber)
+
+    def pick(self, difficulty=None, rng=random):
+        """Random deal, optionally from one difficulty bucket (None if there is none)."""
+        if difficulty is None:
+            return self[rng.randrange(len(self))] if len(self) else None
+        size = self.bucketSize(difficulty)
+        if not size:
+            return None
+        index, = struct.unpack_from("<I", self.buckets[difficulty], 4 * rng.randrange(size))
+        return self[index]
+
+    def close(self):
+        for data in [self.data] + self.buckets:
+            if data is not None:
+                data.close()
+
+class DealDatabaseWriter:
+    # appends records to the end of the file, creating it on first use
+    def __init__(self, path):
+        self.path = path
+        new = not os.path.exists(path) or not os.path.getsize(path)
+        self.file = open(path, "ab")
+        if new:
+            self.file.write(header.pack(magic, version, record.size))
+        self.count = (self.file.tell() - header.size) // record.size
+        self.buckets = [open(bucketPath(path, bucket), "ab") for bucket in range(len(difficultyNames))]
+
+    def append(self, order, solutionLength, nodes, dealNumber=None):
+        difficulty = difficultyFor(nodes)
+        self.file.write(record.pack(bytes(order), solutionLength, difficulty, 0, nodes,
+                                    noDealNumber if dealNumber is None else dealNumber))
+        self.buckets[difficulty].write(struct.pack("<I", self.count))
+        self.count += 1
+
+    def close(self):
+        for file in [self.file] + self.buckets:
+            file.close()
+
+def build(args):
+    # solve numbered deals on a process pool and append the winnable ones
+    # (imported here so the game does not load the solver to read the database)
+    import multiprocessing
+    from .batch import analyzeRange, chunks
+    options = {"mode": "solve", "max_nodes": args.max_nodes, "time_limit": args.time_limit}
+    writer = DealDatabaseWriter(args.path)
+    added = 0
+    try:
+        with multiprocessing.Pool(args.workers) as pool:
+            for results in pool.imap_unordered(analyzeRange, chunks(args.start, args.count, args.chunk, options)):
+                for result in results:
+                    if result["winnable"]:
+                        writer.append(shuffledDeck(result["deal"]), result["solution_length"],
+                                      result["nodes"], result["deal"])
+                        added += 1
+    finally:
+        writer.close()
+    print(f"added {added} winnable deals, {writer.count} in {args.path}")
+
+def info(args):
+    database = DealDatabase(args.path)
+    print(f"{len(database)} deals in {args.path}")
+    for bucket, name in enumerate(difficultyNames):
+        print(f"  {name}: {database.bucketSize(bucket)}")
+    database.close()
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m files.dealdb",
+                                     description="Build or inspect a database of winnable deals.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    builder = commands.add_parser("build", help="solve deals and append the winnable ones")
+    builder.add_argument("path")
+    builder.add_argument("--start", type=int, default=0, help="first deal number")
+    builder.add_argument("--count", type=int, default=1000, help="number of deals to try")
+    builder.add_argument("--workers", type=int, default=os.cpu_count())
+    builder.add_argument("--chunk", type=int, default=50, help="deals per pool task")
+    builder.add_argument("--max-nodes", type=int, default=200000)
+    builder.add_argument("--time-limit", type=float, default=10.0, help="seconds per deal")
+    builder.set_defaults(handler=build)
+    inspector = commands.add_parser("info", help="show deal counts per difficulty")
+    inspector.add_argument("path")
+    inspector.set_defaults(handler=info)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parseArgs()
+    args.handler(args)
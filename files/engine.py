@@ -0,0 +1,200 @@
+import random
+from array import array
+from .history import Move
+
+# --------------------headless Klondike rules engine---------------------#
+# No pygame here: cards are ints 0-51 (suit * 13 + number - 1) and piles are
+# byte arrays, so positions can be simulated without a display or images.
+suits = ("clubs", "diamonds", "hearts", "spades")
+
+# pile indices, shared with SolitaireGame.allPiles and the move log
+tableauPiles = range(0, 7)
+foundationPiles = range(7, 11)
+stockIndex = 11
+wasteIndex = 12
+pileCount = 13
+
+# deals are numbered by the seed used to shuffle them
+dealCount = 1 << 31
+
+# lookup tables are faster than arithmetic in the hot loops
+cardNumbers = tuple(card % 13 + 1 for card in range(52))
+cardSuits = tuple(card // 13 for card in range(52))
+cardIsRed = tuple(suits[card // 13] in ("diamonds", "hearts") for card in range(52))
+
+# cards that may be placed on each card in the tableau / foundations
+tableauChildren = tuple(tuple(child for child in range(52)
+                              if cardIsRed[child] != cardIsRed[card]
+                              and cardNumbers[child] == cardNumbers[card] - 1)
+                        for card in range(52))
+foundationNext = tuple(card + 1 if cardNumbers[card] < 13 else None for card in range(52))
+aces = tuple(card for card in range(52) if cardNumbers[card] == 1)
+kings = tuple(card for card in range(52) if cardNumbers[card] == 13)
+
+def encodeCard(number, suit):
+    return suits.index(suit) * 13 + number - 1
+
+def decodeCard(card):
+    return cardNumbers[card], suits[cardSuits[card]]
+
+def shuffledDeck(dealNumber):
+    """Card ids of deal `dealNumber` in deck order (the same on every machine)."""
+    cards = list(range(52))
+    random.Random(dealNumber).shuffle(cards)
+    return cards
+
+def canStackOnTableau(card, top):
+    # kings on empty piles, otherwise descending in alternating colours
+    if top is None:
+        return cardNumbers[card] == 13
+    return cardIsRed[card] != cardIsRed[top] and cardNumbers[card] == cardNumbers[top] - 1
+
+def canStackOnFoundation(card, top):
+    # aces on empty piles, otherwise ascending in the same suit
+    if top is None:
+        return cardNumbers[card] == 1
+    return cardSuits[card] == cardSuits[top] and cardNumbers[card] == cardNumbers[top] + 1
+
+class Engine:
+    __slots__ = ("piles", "hidden")
+
+    def __init__(self):
+        self.piles = [array('B') for _ in range(pileCount)]
+        # number of face-down cards at the bottom of each tableau pile
+        # (stock cards are always face down, everything else face up)
+        self.hidden = array('B', bytes(pileCount))
+
+    @classmethod
+    def deal(cls, order):
+        """Deal like SolitaireGame.setup_game: `order` is the shuffled deck, drawn from the end."""
+        engine = cls()
+        deck = list(order)
+        for i in tableauPiles:
+            for _ in range(i + 1):
+                engine.piles[i].append(deck.pop())
+            engine.hidden[i] = i
+        engine.piles[stockIndex].extend(deck)
+        return engine
+
+    @classmethod
+    def fromPiles(cls, piles):
+        """Build from pile objects in SolitaireGame.allPiles order."""
+        engine = cls()
+        for index, pile in enumerate(piles):
+            engine.piles[index].extend(card.id for card in pile.pile)
+            if index in tableauPiles:
+                hidden = 0
+                while hidden < len(pile.pile) and not pile.pile[hidden].faceUp:
+                    hidden += 1
+                engine.hidden[index] = hidden
+        return engine
+
+    def copy(self):
+        engine = Engine()
+        engine.piles = [array('B', pile) for pile in self.piles]
+        engine.hidden = array('B', self.hidden)
+        return engine
+
+    def state(self):
+        """Hashable snapshot of the position."""
+        return tuple(pile.tobytes() for pile in self.piles) + (self.hidden.tobytes(),)
+
+    def isWon(self):
+        piles = self.piles
+        return len(piles[7]) + len(piles[8]) + len(piles[9]) + len(piles[10]) == 52
+
+    def legal_moves(self):
+        """All legal moves. Moves onto empty piles are only listed for the first empty pile."""
+        piles = self.piles
+        hidden = self.hidden
+        moves = []
+        append = moves.append
+
+        # which cards each pile would accept right now
+        tableauAccepts = {}
+        emptyTableau = None
+        for t in tableauPiles:
+            if piles[t]:
+                for card in tableauChildren[piles[t][-1]]:
+                    tableauAccepts.setdefault(card, []).append(t)
+            elif emptyTableau is None:
+                emptyTableau = t
+        if emptyTableau is not None:
+            for king in kings:
+                tableauAccepts[king] = [emptyTableau]
+
+        foundationAccepts = {}
+        emptyFoundation = None
+        for f in foundationPiles:
+            if piles[f]:
+                nextCard = foundationNext[piles[f][-1]]
+                if nextCard is not None:
+                    foundationAccepts[nextCard] = f
+            elif emptyFoundation is None:
+                emptyFoundation = f
+        if emptyFoundation is not None:
+            for ace in aces:
+                foundationAccepts[ace] = emptyFoundation
+
+        # tableau runs and tops
+        for i in tableauPiles:
+            pile = piles[i]
+            size = len(pile)
+            if not size:
+                continue
+            down = hidden[i]
+            for start in range(down, size):
+                targets = tableauAccepts.get(pile[start])
+                if targets:
+                    flipped = start == down and down > 0
+                    for target in targets:
+                        if target != i:
+                            append(Move(i, target, size - start, flipped))
+            target = foundationAccepts.get(pile[-1])
+            if target is not None:
+                append(Move(i, target, 1, size - 1 == down and down > 0))
+
+        # waste top
+        if piles[wasteIndex]:
+            card = piles[wasteIndex][-1]
+            target = foundationAccepts.get(card)
+            if target is not None:
+                append(Move(wasteIndex, target, 1, False))
+            for target in tableauAccepts.get(card, ()):
+                append(Move(wasteIndex, target, 1, False))
+
+        # foundation tops back onto the tableau
+        for f in foundationPiles:
+            if piles[f]:
+                for target in tableauAccepts.get(piles[f][-1], ()):
+                    append(Move(f, target, 1, False))
+
+        # draw from the stock, or turn the waste over
+        if piles[stockIndex]:
+            append(Move(stockIndex, wasteIndex, 1, False))
+        elif piles[wasteIndex]:
+            append(Move(wasteIndex, stockIndex, len(piles[wasteIndex]), False))
+
+        return moves
+
+    def apply(self, move):
+        source, target, count, flipped = move
+        src = self.piles[source]
+        dst = self.piles[target]
+        if count == 1:
+            dst.append(src.pop())
+        else:
+            cards = src[-count:]
+            del src[-count:]
+            # the stock is turned over when cards go to or come from it
+            if source == stockIndex or target == stockIndex:
+                cards.reverse()
+            dst.extend(cards)
+        if flipped:
+            self.hidden[source] -= 1
+
+    def undo(self, move):
+        source, target, count, flipped = move
+        if flipped:
+            self.hidden[source] += 1
+        self.apply((target, source, count, False))
@@ -0,0 +1,265 @@
+import argparse
+import os
+import random
+import sys
+import time
+import traceback
+# headless: no window, no audio
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+import pygame
+from .engine import tableauPiles, foundationPiles, stockIndex, wasteIndex, dealCount
+from .engine import cardNumbers, cardIsRed
+
+# --------------------randomized invariant fuzzer---------------------#
+# Drives a real SolitaireGame through the same entry points as a player:
+# synthesized mouse events for drags, drops (onto anything, including
+# nowhere), stock clicks, double-clicks and the buttons, plus direct undo,
+# redo and capture_state/restore_state calls. After every step the table
+# is checked (see checkInvariants) and the last move is undone and redone
+# to check that round trip too. Each seed is one reproducible run; failing
+# runs are shrunk to a minimal action sequence:
+#   python -m files.fuzz --seeds 64 --steps 20000 --workers 8
+# Actions are plain tuples of numbers interpreted against the current table
+# (an action that no longer applies does nothing), so any subsequence of a
+# run can be replayed while shrinking.
+def randomAction(rng):
+    roll = rng.random()
+    if roll < 0.15:
+        return ("stock",)
+    if roll < 0.65:
+        # source pile, which of its cards, target pile, dropped beside any pile
+        return ("drag", rng.randrange(13), rng.random(), rng.randrange(13), rng.random() < 0.05)
+    if roll < 0.73:
+        return ("double", rng.randrange(13))
+    if roll < 0.82:
+        return ("undo", rng.random() < 0.5)
+    if roll < 0.91:
+        return ("redo", rng.random() < 0.5)
+    if roll < 0.95:
+        return ("hint",)
+    if roll < 0.995:
+        return ("restore",)
+    return ("deal", rng.randrange(dealCount))
+
+def newGame(dealNumber):
+    from .game import SolitaireGame
+    if not pygame.display.get_init():
+        pygame.init()
+    game = SolitaireGame(dealNumber=dealNumber, backgroundAssets=False)
+    # deterministic runs: auto-complete lands at once instead of on a timer, and
+    # a click counts as a double-click whenever the action asks for one
+    game.fastForward = False
+    game.doubleClickTime = float("inf")
+    return game
+
+def click(game, position):
+    game.handle_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=position, button=1))
+    game.handle_event(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=position, button=1))
+
+def perform(game, action):
+    kind = action[0]
+    game.lastClick = None
+    if kind == "stock":
+        click(game, game.stockPile.emptyPileRect.center)
+    elif kind == "drag":
+        _, source, fraction, target, miss = action
+        pile = game.allPiles[source]
+        if not pile.pile or source == stockIndex:
+            return
+        card = pile.pile[int(fraction * len(pile.pile))]
+        start = (card.rect.x + 5, card.rect.y + 5)
+        end = (20, 690) if miss else game.allPiles[target].topRect().move(5, 5).topleft
+        game.handle_event(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=start, button=1))
+        game.handle_event(pygame.event.Event(pygame.MOUSEMOTION, pos=end, rel=(0, 0), buttons=(1, 0, 0)))
+        game.handle_event(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=end, button=1))
+    elif kind == "double":
+        pile = game.allPiles[action[1]]
+        if pile.pile and action[1] != stockIndex:
+            position = pile.topRect().move(5, 5).topleft
+            click(game, position)
+            click(game, position)
+    elif kind == "undo":
+        if action[1]:
+            click(game, game.undoButton.rect.center)
+        else:
+            game.undo()
+    elif kind == "redo":
+        if action[1]:
+            click(game, game.redoButton.rect.center)
+        else:
+            game.redo()
+    elif kind == "hint":
+        click(game, game.hintButton.rect.center)
+    elif kind == "restore":
+        state = game.capture_state()
+        game.restore_state(state)
+        if game.capture_state() != state:
+            raise AssertionError("restore_state changed the table")
+    elif kind == "deal":
+        game.nextDeal = action[1]
+        game.setup_game()
+    game.check_auto_complete()
+
+# a table snapshot is one bytes object per pile: card id, plus faceBit when face up
+faceBit = 64
+stripFace = bytes(byte & ~faceBit & 0xFF for byte in range(256))
+# every valid foundation is a prefix of one of these
+fullFoundations = tuple(bytes(suit * 13 + rank | faceBit for rank in range(13)) for suit in range(4))
+# face-up (below, above) pairs allowed in a tableau run
+tableauPairs = frozenset((below | faceBit, above | faceBit) for below in range(52) for above in range(52)
+                         if cardIsRed[below] != cardIsRed[above]
+                         and cardNumbers[above] == cardNumbers[below] - 1)
+
+def snapshot(game):
+    return tuple(bytes([card.id | faceBit if card.faceUp else card.id for card in pile.pile])
+                 for pile in game.allPiles)
+
+def checkInvariants(game, table):
+    """None if the table (a snapshot of `game`) is consistent, otherwise what is wrong."""
+    if game.movingPile.pile:
+        return "cards left in the moving pile"
+    cards = b"".join(table).translate(stripFace)
+    if len(cards) != 52 or len(set(cards)) != 52:
+        return f"{len(set(cards))} distinct cards in {len(cards)}"
+
+    engine = game.engine
+    for index, pile in enumerate(table):
+        if pile.translate(stripFace) != engine.piles[index].tobytes():
+            return "piles and engine disagree"
+    for index in foundationPiles:
+        pile = table[index]
+        if pile and not fullFoundations[(pile[0] & ~faceBit) // 13].startswith(pile):
+            return f"foundation {index} out of order"
+    for index in tableauPiles:
+        pile = table[index]
+        down = 0
+        while down < len(pile) and pile[down] < faceBit:
+            down += 1
+        if pile and down == len(pile):
+            return f"tableau {index} has no face-up card"
+        if down != engine.hidden[index]:
+            return "piles and engine disagree on face-down cards"
+        for position in range(down + 1, len(pile)):
+            if pile[position] < faceBit:
+                return f"face-down card over a face-up one in tableau {index}"
+            if (pile[position - 1], pile[position]) not in tableauPairs:
+                return f"tableau {index} run out of sequence"
+    if table[stockIndex] and max(table[stockIndex]) >= faceBit:
+        return "face-up card in the stock"
+    if table[wasteIndex] and min(table[wasteIndex]) < faceBit:
+        return "face-down card in the waste"
+    return None
+
+def checkUndoRedo(game, table):
+    # undoing and redoing the last entry must give back the same table
+    if not game.history.canUndo():
+        return None
+    moveCount = game.moveCount
+    game.undo()
+    game.redo()
+    if snapshot(game) != table:
+        return "undo then redo changed the table"
+    if any(pile.translate(stripFace) != engine.tobytes() for pile, engine in zip(table, game.engine.piles)):
+        return "undo then redo changed the engine"
+    if game.moveCount != moveCount:
+        return "undo then redo changed the move count"
+    return None
+
+def checkStep(game):
+    table = snapshot(game)
+    return checkInvariants(game, table) or checkUndoRedo(game, table)
+
+def runActions(dealNumber, actions, game=None):
+    """Play `actions` on a fresh deal; (index of the failing action, message) or None."""
+    game = game or newGame(dealNumber)
+    # a failed step may have left cards in the hand
+    game.movingPile.pile = []
+    game.nextDeal = dealNumber
+    game.setup_game()
+    for index, action in enumerate(actions):
+        try:
+            perform(game, action)
+            failure = checkStep(game)
+        except Exception as error:
+            failure = f"{type(error).__name__}: {error}"
+        if failure:
+            return index, failure
+    return None
+
+def shrink(dealNumber, actions, failure, game):
+    """Smallest action sequence found that still fails with `failure` (delta debugging)."""
+    def fails(candidate):
+        result = runActions(dealNumber, candidate, game)
+        return result is not None and result[1] == failure
+
+    chunk = len(actions) // 2
+    while chunk:
+        start = 0
+        while start < len(actions):
+            candidate = actions[:start] + actions[start + chunk:]
+            if candidate and fails(candidate):
+                actions = candidate
+            else:
+                start += chunk
+        chunk //= 2
+    return actions
+
+def fuzzSeed(task):
+    """Run one seed; returns (seed, steps run, None or (failure, shrunk actions, traceback))."""
+    seed, steps = task
+    rng = random.Random(seed)
+    dealNumber = seed
+    game = newGame(dealNumber)
+    actions = []
+    for step in range(steps):
+        action = randomAction(rng)
+        actions.append(action)
+        try:
+            perform(game, action)
+            failure = checkStep(game)
+            trace = None
+        except Exception as error:
+            failure = f"{type(error).__name__}: {error}"
+            trace = traceback.format_exc()
+        if failure:
+            return seed, step + 1, (failure, shrink(dealNumber, actions, failure, game), trace)
+    return seed, steps, None
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m files.fuzz",
+                                     description="Fuzz the game's move, undo and state handling.")
+    parser.add_argument("--seeds", type=int, default=16, help="number of seeds (one run each)")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--steps", type=int, default=10000, help="actions per seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    return parser.parse_args(argv)
+
+def runFuzz(args):
+    tasks = [(seed, args.steps) for seed in range(args.first_seed, args.first_seed + args.seeds)]
+    started = time.perf_counter()
+    if args.workers > 1:
+        import multiprocessing
+        with multiprocessing.Pool(args.workers) as pool:
+            results = list(pool.imap_unordered(fuzzSeed, tasks))
+    else:
+        results = [fuzzSeed(task) for task in tasks]
+    elapsed = time.perf_counter() - started
+
+    failures = sorted(result for result in results if result[2])
+    for seed, steps, (failure, actions, trace) in failures:
+        print(f"seed {seed} failed after {steps} steps: {failure}")
+        print(f"  minimal sequence ({len(actions)} actions) on deal {seed}:")
+        for action in actions:
+            print(f"    {action}")
+        if trace:
+            print("  " + trace.rstrip().replace("\n", "\n  "))
+    total = sum(steps for _, steps, _ in results)
+    print(f"{len(results)} seeds, {total} steps, {len(failures)} failing "
+          f"in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} steps/s)", file=sys.stderr)
+    return not failures
+
+
+if __name__ == '__main__':
+    sys.exit(0 if runFuzz(parseArgs()) else 1)
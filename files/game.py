@@ -1,30 +1,87 @@
+import os
 import sys
 import pygame
 import random
 import time
-from .cards import Card
+from collections import deque
+from .cards import cardSet
 from .piles import Pile, StockPile, WastePile, FoundationPile, MovingPile
-from .buttons import UndoButton, RedoButton, ResetButton
+from .buttons import UndoButton, RedoButton, ResetButton, HintButton
 from .constants import screenSize, darkGreen
-from .utils import loadImage
+from .utils import assetLoader
+from .atlas import loadAtlas, atlasEntries
+from .history import History, Move, Batch, movesOf
+from .engine import Engine, stockIndex, wasteIndex, shuffledDeck, dealCount
+from .render import createRenderer
+from .hittest import HitTestIndex
+from .moveindex import MoveIndex
+from .autocomplete import canAutoComplete, planFoundationMoves
+from .text import textCache
+from .profiler import FrameProfiler, ProfilerOverlay, EVENTS, VICTORY
+from .replay import ReplayWriter, replayName, pileName, UNDO, REDO
+from .savegame import SaveData, SaveWriter, encodeSave, loadSave
+from .analysis import AnalysisWorker
+from .stats import StatsStore, StatsPanel
 
 # ---------------- Deck Class ----------------
 class Deck:
-    def __init__(self):
-        self.cards = [Card(number, suit) for suit in Card.suits for number in range(1, 14)]
+    def __init__(self, cards=None):
+        # a game deals its own card set (see cardSet) instead of creating new cards
+        self.cards = list(cards if cards is not None else cardSet())
     
-    def shuffle(self):
-        random.shuffle(self.cards)
+    def shuffle(self, dealNumber):
+        self.arrange(shuffledDeck(dealNumber))
+
+    def arrange(self, order):
+        # cards are created in id order, so any deal is just a permutation of ids
+        self.cards = [self.cards[card] for card in order]
     
     def draw(self):
         return self.cards.pop() if self.cards else None
 # --------------------------------------------
 
 class SolitaireGame:
-    def __init__(self):
-        # Set up the screen and clock
-        self.screen = pygame.display.set_mode(screenSize)
+    statusBarRect = pygame.Rect(0, screenSize[1] - 70, screenSize[0], 70)
+    # outlines for valid drop targets while dragging and for the suggested move
+    dropTargetColour = (80, 200, 255)
+    hintColour = (255, 215, 0)
+    # milliseconds between the clicks of a double-click
+    doubleClickTime = 400
+
+    def __init__(self, historyLimit=1000, checkpointInterval=100, dealNumber=None,
+                 dealDatabase=None, difficulty=None, replayDir=None, savePath=None,
+                 resume=True, backgroundAssets=True, analysis=False, statsPath=None,
+                 renderer="surface"):
+        # Set up the screen and clock; the "texture" renderer draws through
+        # pygame._sdl2 into its own window and `screen` is then offscreen
+        self.renderer = createRenderer(renderer)
+        self.screen = self.renderer.screen
         self.clock = pygame.time.Clock()
+        # frame caps (0 = uncapped); while idle the loop sleeps in event.wait
+        # instead, waking for input or the next status-bar clock tick
+        self.frameRate = 60
+        self.dragFrameRate = 60
+        self.idleWait = True
+        # event that ended an idle wait, handled first next frame, and when it arrived
+        self.wakeEvent = None
+        self.wakeTime = 0.0
+
+        # Frame profiler (F3 shows the overlay, F4 exports a Chrome trace)
+        self.profiler = FrameProfiler()
+        self.profilerOverlay = ProfilerOverlay(self.profiler, screenSize[0] - 310, 10,
+                                               pygame.font.Font(None, 20))
+        # trace written on exit when set (F4 writes frame_trace.json otherwise)
+        self.tracePath = None
+        # each game is logged to its own replay file here when set
+        self.replayDir = replayDir
+        self.replay = None
+
+        # Fill the sprite cache: from the atlas in one read if it is built, otherwise
+        # image by image on a background thread (placeholders are drawn meanwhile)
+        # or on first use
+        if not loadAtlas():
+            assetLoader.enabled = backgroundAssets
+        self.assetsRequested = False
 
         # Initialize game components
         self.piles = []
@@ -32,308 +89,722 @@ class SolitaireGame:
         self.movingPile = MovingPile()
         self.stockPile = None
         self.wastePile = None
+        # headless model of the table, kept in step with the piles
+        self.engine = None
         self.resetButton = ResetButton(posX=1100, posY=710)
         self.undoButton = UndoButton(posX=670, posY=710)
         self.redoButton = RedoButton(posX=870, posY=710)
-
-        self.undo_stack = []
-        self.redo_stack = []
+        self.hintButton = HintButton(posX=470, posY=710)
+        # last card clicked and when, to detect double-clicks
+        self.lastClick = None
+        self.lastClickTime = 0
+
+        self.allPiles = []
+        # the 52 Card objects of this game, reused by every deal and restore
+        self.cards = cardSet()
+        # maps points to cards and dragged cards to drop targets
+        self.hitIndex = HitTestIndex()
+        # piles accepting each card, kept up to date move by move
+        self.moveIndex = MoveIndex()
+        # Once only foundation moves are left they are played for the player as
+        # one undo entry; with fastForward the cards fly up on a timer (several
+        # per frame if need be) instead of appearing at once
+        self.autoComplete = True
+        self.fastForward = True
+        self.autoPlaybackInterval = 0.015
+        self.autoPlayback = deque()
+        self.autoPlaybackDue = 0.0
+        # set by a player move; the auto-complete check runs once per frame
+        self.autoCompleteCheck = False
+        # Monte Carlo playouts in a worker process (F2 toggles): win odds and
+        # the best move for the table, streamed back while the game runs on.
+        # The table is sent at most once per frame, after it changed.
+        self.analysis = AnalysisWorker() if analysis else None
+        self.analysisDirty = True
+        # bounded log of moves for undo/redo; every checkpointInterval moves the
+        # table is also captured, so undo can rewind past the moves dropped
+        # from the front of the log
+        self.history = History(historyLimit, checkpointInterval, self.checkpoint_state)
 
         # Time and move tracking
         self.startTime = time.time()
         self.moveCount = 0
 
-        # Flag to reset game
-        self.reset = True
-        self.setup_game()
+        # Deal to play next (random when None) and the deal on the table
+        self.nextDeal = dealNumber
+        self.dealNumber = None
+        # optional DealDatabase of verified winnable deals to pick from
+        self.dealDatabase = dealDatabase
+        self.difficulty = difficulty
 
-        # Set initial state after game setup
+        # Flag to reset game
+        self.reset = False
+        self.victory = False
+
+        # Pre-composited status bar (rebuilt when its text changes) and victory overlay
+        self.statusSurface = pygame.Surface(self.statusBarRect.size)
+        self.statusSurfaceKey = None
+        self.victoryOverlay = None
+
+        # Saved on exit and every autosaveInterval seconds (on a background thread)
+        # when savePath is set, and resumed from on start
+        self.saver = SaveWriter(savePath) if savePath else None
+        self.autosaveInterval = 30
+        self.lastAutosave = time.time()
+        self.autosaveKey = None
+        # bumped by every change to the table or the move log; autosave compares it
+        self.changeCount = 0
+
+        # Every finished or abandoned game is recorded to an SQLite store on a
+        # writer thread when statsPath is set; F5 shows the totals
+        self.stats = StatsStore(statsPath) if statsPath else None
+        self.statsPanel = StatsPanel(self.stats, screenSize[0] - 310, 130) if self.stats else None
+        # the game on the table has been recorded (won, or abandoned by a new deal)
+        self.gameRecorded = False
+
+        save = loadSave(savePath) if savePath and resume else None
+        # a game that was won before quitting is over: deal a new one instead
+        if save is not None and not save.engine.isWon():
+            self.resume_game(save)
+        else:
+            self.setup_game()
 
     def check_game_complete(self):
-        for pile in self.foundationPiles:
-            if len(pile.pile) != 13:
-                return False
-        return True
+        # not before the auto-complete animation has finished
+        return self.engine.isWon() and not self.autoPlayback
     
 
     def display_victory_message(self):
-        overlay = pygame.Surface(screenSize)
-        overlay.set_alpha(180)
-        overlay.fill((0, 0, 0))
-        self.screen.blit(overlay, (0, 0))
-
-        font = pygame.font.Font(None, 80)
-        text = font.render("YOU WIN!", True, (255, 215, 0))
+        # the overlay is built once and reused on every frame after a win
+        if self.victoryOverlay is None:
+            self.victoryOverlay = pygame.Surface(screenSize)
+            self.victoryOverlay.set_alpha(180)
+            self.victoryOverlay.fill((0, 0, 0))
+        self.screen.blit(self.victoryOverlay, (0, 0))
+
+        text = textCache.render("YOU WIN!", 80, (255, 215, 0))
         rect = text.get_rect(center=(screenSize[0]//2, screenSize[1]//2))
         self.screen.blit(text, rect)
 
 
 
     def setup_game(self):
+        # dealing again abandons the game on the table
+        self.record_game(False)
+        self.gameRecorded = False
+        self.changeCount += 1
+        self.autoPlayback.clear()
         self.moveCount = 0
-
-        # Clear previous state
-        self.piles.clear()
-        self.foundationPiles.clear()
-        self.undo_stack.clear()
-        self.redo_stack.clear()
+        self.startTime = time.time()
+        self.victory = False
+        self.renderer.invalidate()
 
         # Create deck and shuffle
-        deck = Deck()
-        deck.shuffle()
-
-        # Create tableau piles
-        for i in range(7):
-            pile = Pile(posX=100 + i * Pile.pileSpacing, posY=200)
+        deck = Deck(self.cards)
+        saved = None
+        if self.nextDeal is None and self.dealDatabase is not None:
+            saved = self.dealDatabase.pick(self.difficulty)
+        if saved is not None:
+            # guaranteed winnable deal from the database
+            self.dealNumber = saved.dealNumber
+            deck.arrange(saved.order)
+        else:
+            if self.nextDeal is None:
+                self.dealNumber = random.randrange(dealCount)
+            else:
+                self.dealNumber = self.nextDeal
+                self.nextDeal = None
+            deck.shuffle(self.dealNumber)
+        order = [card.id for card in deck.cards]
+        self.engine = Engine.deal(order)
+        self.moveIndex.rebuild(self.engine)
+        self.analysisDirty = True
+        if self.stats:
+            self.stats.watchDeal(self.dealNumber)
+        self.start_replay(order)
+        self.create_piles()
+
+        # Deal the tableau
+        for i, pile in enumerate(self.piles):
             for j in range(i + 1):
                 card = deck.draw()
-                if j == i:
-                    card.faceUp = True
+                # cards come face up from the last game too
+                card.faceUp = j == i
                 pile.addCard(card)
             pile.update()
-            self.piles.append(pile)
-
-        # Create foundation piles
-        for i in range(4):
-            foundation = FoundationPile(posX=600 + i * Pile.pileSpacing, posY=50)
-            self.foundationPiles.append(foundation)
 
-        # Create stock pile
-        self.stockPile = StockPile(deck.cards, posX=50, posY=50)
+        # The rest of the deck is the stock
+        self.stockPile.pile = deck.cards
         self.stockPile.update()
+        self.history.clear()
 
-        # Create waste pile
-        self.wastePile = WastePile(posX=200, posY=50)
-
-        # 🔥🔥🔥 ADD THIS BLOCK RIGHT HERE 🔥🔥🔥
-        # Save initial state properly
-        self.undo_stack.append({
-            "piles": [pile.get_state() for pile in self.piles],
-            "foundations": [pile.get_state() for pile in self.foundationPiles],
-            "stock": self.stockPile.get_state(),
-            "waste": self.wastePile.get_state(),
-            "moveCount": self.moveCount
-        })
-        self.redo_stack.clear()
-
+    def create_piles(self):
+        # the piles are built once; a new deal or a resumed game just empties them
+        if self.allPiles:
+            for pile in self.allPiles:
+                pile.pile.clear()
+                pile.setHighlight(None)
+                pile.update()
+            return
 
+        # Create tableau piles
+        self.piles = [Pile(posX=100 + i * Pile.pileSpacing, posY=200) for i in range(7)]
 
-    
-    def handle_events(self):
-
-        for event in pygame.event.get():
+        # Create foundation piles
+        self.foundationPiles = [FoundationPile(posX=600 + i * Pile.pileSpacing, posY=50)
+                                for i in range(4)]
 
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+        # Create stock and waste piles
+        self.stockPile = StockPile(posX=50, posY=50)
+        self.wastePile = WastePile(posX=200, posY=50)
 
-            # ----------------------------
-            # MOUSE BUTTON DOWN
-            # ----------------------------
-            if event.type == pygame.MOUSEBUTTONDOWN:
+        # Index every pile for the move log and for hit testing
+        self.allPiles = self.piles + self.foundationPiles + [self.stockPile, self.wastePile]
+        self.hitIndex.clear()
+        for pile in self.allPiles:
+            self.hitIndex.add(pile, dropTarget=pile in self.piles or pile in self.foundationPiles)
+
+    def save_data(self):
+        """The game as save-file bytes (a few hundred bytes; cheap enough for any frame)."""
+        return encodeSave(SaveData(self.engine, self.dealNumber, self.moveCount,
+                                   time.time() - self.startTime, self.history.undoStack,
+                                   self.history.redoStack, self.history.baseIndex))
+
+    def resume_game(self, save):
+        self.changeCount += 1
+        self.autoPlayback.clear()
+        self.engine = save.engine
+        self.moveIndex.rebuild(self.engine)
+        self.analysisDirty = True
+        self.dealNumber = save.dealNumber
+        self.moveCount = save.moveCount
+        self.startTime = time.time() - save.elapsed
+        self.victory = False
+        # a game saved after its win was recorded then
+        self.gameRecorded = save.engine.isWon()
+        if self.stats:
+            self.stats.watchDeal(self.dealNumber)
+        self.renderer.invalidate()
+        # the deal order is not saved, so a resumed game is not recorded
+        if self.replay:
+            self.replay.close()
+            self.replay = None
+
+        self.lay_out_engine()
+        self.history.load(save.undoMoves, save.redoMoves, save.historyBase)
+
+    def lay_out_engine(self):
+        # put the engine's position on the table with the game's cards
+        self.create_piles()
+        for index, pile in enumerate(self.allPiles):
+            cards = self.engine.piles[index]
+            pile.set_state((cards, [position >= self.engine.hidden[index] for position in range(len(cards))]),
+                           self.cards)
+
+    def record_game(self, won):
+        # queue the game for the stats store, once, if it was played at all
+        if self.stats is None or self.gameRecorded or self.engine is None or not (won or self.moveCount):
+            return
+        self.gameRecorded = True
+        self.stats.record(self.dealNumber, won, time.time() - self.startTime, self.moveCount)
+
+    def autosave(self):
+        # hand a snapshot to the writer thread every autosaveInterval seconds, if anything changed
+        now = time.time()
+        if self.saver is None or now - self.lastAutosave < self.autosaveInterval:
+            return
+        self.lastAutosave = now
+        if self.changeCount != self.autosaveKey:
+            self.autosaveKey = self.changeCount
+            self.saver.submit(self.save_data())
 
-                # Undo
-                if self.undoButton.handleMouseDown():
-                    self.undo()
-                    return
 
-                # Redo
-                if self.redoButton.handleMouseDown():
-                    self.redo()
-                    return
 
-                # Reset
-                if self.resetButton.handleMouseDown():
-                    self.reset = True
+    
+    def handle_events(self):
+        # all motion events queued since the last frame collapse into the latest
+        # position, applied once (but always before a later click or drop)
+        # input latency is measured from when an event is taken off the queue
+        events = pygame.event.get()
+        received = time.perf_counter()
+        times = [received] * len(events)
+        if self.wakeEvent is not None:
+            events.insert(0, self.wakeEvent)
+            times.insert(0, self.wakeTime)
+            self.wakeEvent = None
+        motion = None
+        for event, eventTime in zip(events, times):
+            if event.type == pygame.MOUSEMOTION:
+                motion, motionTime = event, eventTime
+                continue
+            if motion is not None:
+                self.handle_event(motion, motionTime)
+                motion = None
+            self.handle_event(event, eventTime)
+        if motion is not None:
+            self.handle_event(motion, motionTime)
+
+    def handle_event(self, event, received=None):
+        if event.type == pygame.QUIT:
+            self.quit()
+
+        if event.type == pygame.WINDOWEXPOSED:
+            self.renderer.invalidate()
+
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION):
+            self.profiler.inputEvent(received)
+
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_F2:
+                self.toggle_analysis()
+            elif event.key == pygame.K_F3:
+                self.profilerOverlay.toggle()
+                self.profiler.enabled = self.profilerOverlay.visible or self.tracePath is not None
+            elif event.key == pygame.K_F4:
+                self.profiler.exportTrace(self.tracePath or "frame_trace.json")
+            elif event.key == pygame.K_F5 and self.statsPanel:
+                self.statsPanel.toggle()
+
+        # ----------------------------
+        # MOUSE BUTTON DOWN
+        # ----------------------------
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.finish_auto_complete()
+            self.clear_highlights()
+
+            # Hint
+            if self.hintButton.handleMouseDown(event.pos):
+                self.show_hint()
+                return
+
+            # Undo
+            if self.undoButton.handleMouseDown(event.pos):
+                self.undo()
+                return
+
+            # Redo
+            if self.redoButton.handleMouseDown(event.pos):
+                self.redo()
+                return
+
+            # Reset
+            if self.resetButton.handleMouseDown(event.pos):
+                self.reset = True
+                return
+
+            # Left Click
+            if event.button == 1:
+
+                mouseX, mouseY = event.pos
+
+                # STOCK CLICK
+                if self.stockPile.emptyPileRect.collidepoint(mouseX, mouseY):
+                    if self.stockPile.pile:
+                        move = Move(stockIndex, wasteIndex, 1, False)
+                    elif self.wastePile.pile:
+                        move = Move(wasteIndex, stockIndex, len(self.wastePile.pile), False)
+                    else:
+                        return
+                    self.wastePile.handleMouseDown(self.stockPile, event.pos)
+                    self.record_move(move)
                     return
 
-                # Left Click
-                if event.button == 1:
-
-                    mouseX, mouseY = pygame.mouse.get_pos()
-
-                    # STOCK CLICK
-                    if self.stockPile.emptyPileRect.collidepoint(mouseX, mouseY):
-                        self.save_state()
-                        self.wastePile.handleMouseDown(self.stockPile)
-                        self.moveCount += 1
+                # PICK FROM TABLEAU, WASTE OR FOUNDATION
+                hit = self.hitIndex.cardAt(mouseX, mouseY)
+                if hit:
+                    pile, index = hit
+                    card = pile.pile[index]
+                    now = pygame.time.get_ticks()
+                    if (card is self.lastClick and now - self.lastClickTime <= self.doubleClickTime
+                            and self.move_to_foundation(pile, index)):
+                        self.lastClick = None
                         return
+                    self.lastClick = card
+                    self.lastClickTime = now
+
+                    self.movingPile.handleMouseDown(pile, event.pos)
+                    if self.movingPile.pile:
+                        self.highlight_drop_targets()
+
+        # ----------------------------
+        # MOUSE MOTION (DRAGGING)
+        # ----------------------------
+        elif event.type == pygame.MOUSEMOTION:
+            if self.movingPile.pile:
+                self.movingPile.handleMouseMotion(event.pos)
+
+        # ----------------------------
+        # MOUSE BUTTON UP (DROP)
+        # ----------------------------
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if self.movingPile.pile:
+
+                source = self.movingPile.previousPile
+                count = len(self.movingPile.pile)
+
+                target = self.movingPile.handleMouseUp(
+                    self.hitIndex.dropTargets(self.movingPile.leadRect())
+                )
+                self.clear_highlights()
 
-                    # PICK FROM TABLEAU
-                    for pile in self.piles:
-                        self.movingPile.handleMouseDown(pile)
-
-                    # PICK FROM WASTE
-                    self.movingPile.handleMouseDown(self.wastePile)
-
-                    # PICK FROM FOUNDATION
-                    for pile in self.foundationPiles:
-                        self.movingPile.handleMouseDown(pile)
-
-            # ----------------------------
-            # MOUSE MOTION (DRAGGING)
-            # ----------------------------
-            elif event.type == pygame.MOUSEMOTION:
-                if self.movingPile.pile:
-                    self.movingPile.handleMouseMotion()
-
-            # ----------------------------
-            # MOUSE BUTTON UP (DROP)
-            # ----------------------------
-            elif event.type == pygame.MOUSEBUTTONUP:
-                if self.movingPile.pile:
-
-                    # Save previous state BEFORE move
-                    previous_state = {
-                        "piles": [pile.get_state() for pile in self.piles],
-                        "foundations": [pile.get_state() for pile in self.foundationPiles],
-                        "stock": self.stockPile.get_state(),
-                        "waste": self.wastePile.get_state(),
-                        "moveCount": self.moveCount
-                    }
-
-                    moved = self.movingPile.handleMouseUp(
-                        self.piles + self.foundationPiles
-                    )
-
-                    if moved:
-                        self.undo_stack.append(previous_state)
-                        self.redo_stack.clear()
-                        self.moveCount += 1
-
-
+                if target:
+                    self.record_move(Move(self.allPiles.index(source),
+                                          self.allPiles.index(target),
+                                          count, self.movingPile.flipped))
 
     def draw_status_bar(self):
-        elapsed = int(time.time() - self.startTime)
+        # only rebuilt when the shown second or the move count changes
+        key = self.status_key()
+        if key != self.statusSurfaceKey:
+            self.statusSurfaceKey = key
+            self.build_status_bar(*key)
+        self.screen.blit(self.statusSurface, self.statusBarRect)
+
+    def build_status_bar(self, elapsed, moveCount, analysisText=None):
         minutes = elapsed // 60
         seconds = elapsed % 60
-
-        font = pygame.font.Font(None, 32)
-
-        pygame.draw.rect(self.screen, (20, 100, 20),
-                        (0, screenSize[1] - 70, screenSize[0], 70))
-
-        timeText = font.render(f"Time: {minutes:02}:{seconds:02}", True, (255,255,255))
-        movesText = font.render(f"Moves: {self.moveCount}", True, (255,255,255))
-
-        self.screen.blit(timeText, (50, screenSize[1] - 45))
-        self.screen.blit(movesText, (250, screenSize[1] - 45))
-
-        self.undoButton.draw(self.screen)
-        self.redoButton.draw(self.screen)
-        self.resetButton.draw(self.screen)
-
-        label_font = pygame.font.Font(None, 32)
-
-        undoText = label_font.render("Undo", True, (255,255,255))
-        redoText = label_font.render("Redo", True, (255,255,255))
-        resetText = label_font.render("Reset", True, (255,255,255))
-
-        self.screen.blit(undoText, (self.undoButton.rect.x, self.undoButton.rect.y + 28))
-        self.screen.blit(redoText, (self.redoButton.rect.x, self.redoButton.rect.y + 28))
-        self.screen.blit(resetText, (self.resetButton.rect.x, self.resetButton.rect.y + 28))
-
+        surface = self.statusSurface
+        top = self.statusBarRect.y
+
+        surface.fill((20, 100, 20))
+
+        timeText = textCache.render(f"Time: {minutes:02}:{seconds:02}", 32, (255,255,255))
+        movesText = textCache.render(f"Moves: {moveCount}", 32, (255,255,255))
+
+        surface.blit(timeText, (50, screenSize[1] - 45 - top))
+        surface.blit(movesText, (250, screenSize[1] - 45 - top))
+        if analysisText:
+            surface.blit(textCache.render(analysisText, 20, (255, 235, 150)), (50, 5))
+
+        for button, label in ((self.hintButton, "Hint"), (self.undoButton, "Undo"),
+                              (self.redoButton, "Redo"), (self.resetButton, "Reset")):
+            if button.image is not None:
+                surface.blit(button.image, button.rect.move(0, -top))
+            surface.blit(textCache.render(label, 32, (255,255,255)),
+                         (button.rect.x, button.rect.y + 28 - top))
+
+
+    def status_key(self):
+        # the status bar only changes when the shown second, move count or analysis line does
+        return int(time.time() - self.startTime), self.moveCount, self.analysis_text()
+
+    def analysis_text(self):
+        if self.analysis is None or self.engine.isWon():
+            return None
+        result = self.analysis.result
+        if result is None:
+            return "Analysing..."
+        if result.deadEnd():
+            return f"Likely dead end ({sum(result.playouts)} playouts)"
+        move = result.moves[result.best()]
+        return (f"Win chance {result.winProbability():.0%} - best: {pileName(move.source)} -> "
+                f"{pileName(move.target)} ({sum(result.playouts)} playouts)")
+
+    def drawables(self):
+        drawables = self.piles + self.foundationPiles + [self.stockPile, self.wastePile, self.movingPile,
+                                                        self.profilerOverlay]
+        if self.statsPanel:
+            drawables.append(self.statsPanel)
+        return drawables
+
+    def run_frame(self):
+        self.profiler.beginFrame()
+        if self.reset:
+            self.setup_game()
+            self.reset = False
+
+        self.handle_events()
+        self.check_auto_complete()
+        self.advance_auto_complete()
+        self.update_analysis()
+        if assetLoader.poll():
+            self.assets_arrived()
+        self.profiler.mark(EVENTS)
+
+        # Check for game completion
+        victory = self.check_game_complete()
+        if victory != self.victory:
+            self.victory = victory
+            self.renderer.invalidate()
+            if victory:
+                self.record_game(True)
+        self.profiler.mark(VICTORY)
+
+        # Render only what changed since the last frame
+        self.profilerOverlay.update()
+        if self.statsPanel:
+            self.statsPanel.update()
+        self.renderer.render(self)
+        if assetLoader.enabled and not self.assetsRequested:
+            # what the first frame showed was requested first; queue the rest behind it
+            self.assetsRequested = True
+            for path, size in atlasEntries():
+                assetLoader.request(path, size)
+        self.profiler.endFrame()
+        self.autosave()
+        self.wait_for_next_frame()
+
+    def update_analysis(self):
+        # never blocks: send the table if it changed, take whatever results have arrived
+        if self.analysis is None:
+            return
+        if self.analysisDirty:
+            self.analysisDirty = False
+            self.analysis.submit(self.engine)
+        self.analysis.poll()
+
+    def toggle_analysis(self):
+        if self.analysis is None:
+            self.analysis = AnalysisWorker()
+            self.analysisDirty = True
+        else:
+            self.analysis.close()
+            self.analysis = None
+
+    def assets_arrived(self):
+        # swap placeholders for the images that finished loading
+        self.renderer.invalidate()
+        self.statusSurfaceKey = None
+        if self.movingPile.pile:
+            self.movingPile.composeDragSurface()
+
+    def idle_timeout(self):
+        # milliseconds until the status-bar clock shows the next second
+        elapsed = time.time() - self.startTime
+        timeout = (int(elapsed) + 1 - elapsed) * 1000
+        if self.profilerOverlay.visible:
+            timeout = min(timeout, self.profilerOverlay.refreshInterval * 1000)
+        if self.analysis is not None and self.analysis.busy:
+            # wake for the next batch of analysis results
+            timeout = min(timeout, self.analysis.interval * 1000)
+        return max(1, int(timeout) + 1)
+
+    def wait_for_next_frame(self):
+        if self.movingPile.pile:
+            self.clock.tick(self.dragFrameRate)
+        elif (self.idleWait and not self.reset and not self.autoPlayback and not assetLoader.busy
+              and not pygame.event.peek()):
+            # nothing moves on screen: block until input or the clock needs redrawing
+            event = pygame.event.wait(self.idle_timeout())
+            if event.type != pygame.NOEVENT:
+                self.wakeEvent = event
+                self.wakeTime = time.perf_counter()
+            self.clock.tick()
+        else:
+            self.clock.tick(self.frameRate)
+
+    def quit(self):
+        if self.tracePath and self.profiler.frames:
+            self.profiler.exportTrace(self.tracePath)
+        if self.replay:
+            self.replay.close()
+        if self.analysis:
+            self.analysis.close()
+        if self.saver:
+            self.saver.close(self.save_data())
+        elif not self.victory:
+            # without a save the game cannot be resumed
+            self.record_game(False)
+        if self.stats:
+            self.stats.close()
+        pygame.quit()
+        sys.exit()
 
     def run(self):
         # Main game loop
         while True:
-            if self.reset:
-                self.setup_game()
-                self.reset = False
-
-            self.handle_events()
-
-            # Render game objects
-            # self.screen.fill(darkGreen)
-            for y in range(screenSize[1]):
-                color = (
-                    20,
-                    90 + y // 20,
-                    40
-                )
-                pygame.draw.line(self.screen, color, (0, y), (screenSize[0], y))
-            for pile in self.piles: 
-                pile.draw(self.screen)
-            for pile in self.foundationPiles: 
-                pile.draw(self.screen)
-            self.stockPile.draw(self.screen)
-            self.wastePile.draw(self.screen)
-            self.movingPile.draw(self.screen)
-            self.draw_status_bar()
-
-            # Check for game completion
-            if self.check_game_complete():
-                self.display_victory_message()
-                
-            pygame.display.flip()
-            self.clock.tick(60)
-
-    def save_state(self):
-        state = {
-            "piles": [pile.get_state() for pile in self.piles],
-            "foundations": [pile.get_state() for pile in self.foundationPiles],
-            "stock": self.stockPile.get_state(),
-            "waste": self.wastePile.get_state(),
-            "moveCount": self.moveCount
-        }
-        self.undo_stack.append(state)
-        self.redo_stack.clear()
-
-
-    def load_state(self, state):
-        for pile, saved in zip(self.piles, state["piles"]):
-            pile.set_state(saved)
-            pile.update()
-
-        for pile, saved in zip(self.foundationPiles, state["foundations"]):
-            pile.set_state(saved)
-            pile.update()
-
-        self.stockPile.set_state(state["stock"])
-        self.stockPile.update()
-
-        self.wastePile.set_state(state["waste"])
-        self.wastePile.update()
+            self.run_frame()
+
+    def start_replay(self, order):
+        if self.replay:
+            self.replay.close()
+            self.replay = None
+        if self.replayDir:
+            os.makedirs(self.replayDir, exist_ok=True)
+            self.replay = ReplayWriter(os.path.join(self.replayDir, replayName(self.dealNumber)),
+                                       order, self.dealNumber)
+
+    def clear_highlights(self):
+        for pile in self.allPiles:
+            pile.setHighlight(None)
+
+    def highlight_drop_targets(self):
+        # the piles that would accept the dragged cards, straight from the move index
+        source = self.allPiles.index(self.movingPile.previousPile)
+        for target in self.moveIndex.targetsFor(self.movingPile.pile[0].id, len(self.movingPile.pile)):
+            if target != source:
+                self.allPiles[target].setHighlight(self.dropTargetColour)
+
+    def show_hint(self):
+        # the analysis' best move once it has results for this table, the move index's otherwise
+        move = self.analysis_move() or self.moveIndex.hint()
+        if move is None:
+            return
+        source = self.allPiles[move.source]
+        index = len(source.pile) - move.count if move.source != stockIndex else None
+        source.setHighlight(self.hintColour, index)
+        self.allPiles[move.target].setHighlight(self.hintColour)
+
+    def analysis_move(self):
+        if self.analysis is None or self.analysisDirty:
+            return None
+        result = self.analysis.result
+        if result is None or result.deadEnd() or not any(result.wins):
+            return None
+        return result.moves[result.best()]
+
+    def move_to_foundation(self, pile, index):
+        """Send the top card of a tableau or waste pile to its foundation (double-click)."""
+        source = self.allPiles.index(pile)
+        if index != len(pile.pile) - 1 or pile in self.foundationPiles or pile is self.stockPile:
+            return False
+        target = self.moveIndex.foundationFor(pile.pile[index].id)
+        if target is None:
+            return False
+        self.play_move(Move(source, target, 1, self.moveIndex.flips(source, index)))
+        return True
 
-        self.moveCount = state["moveCount"]
+    def play_move(self, move):
+        # move the cards on the table and log it, as if dragged by the player
+        self.apply_move(move)
+        self.record_move(move)
+
+    def record_move(self, move):
+        # the piles already hold the result of the move; log it and update the model
+        self.engine.apply(move)
+        self.moveIndex.moved(move)
+        self.moveCount += 1
+        self.history.push(move)
+        if self.replay:
+            self.replay.write(move)
+        self.autoCompleteCheck = True
+        self.analysisDirty = True
+        self.changeCount += 1
+
+    def check_auto_complete(self):
+        # once per frame after a player move: finish the game if only foundation moves are left
+        if self.autoCompleteCheck:
+            self.autoCompleteCheck = False
+            if self.autoComplete and canAutoComplete(self.engine):
+                self.auto_complete()
+
+    def auto_complete(self):
+        """Play every remaining foundation move as a single history entry."""
+        moves = planFoundationMoves(self.engine)
+        if not moves:
+            return
+        for move in moves:
+            self.engine.apply(move)
+            self.moveIndex.moved(move)
+            if self.replay:
+                self.replay.write(move)
+        self.moveCount += len(moves)
+        self.history.push(Batch(moves))
+        self.analysisDirty = True
+        self.changeCount += 1
+        # the model is already complete; the piles catch up on screen
+        self.autoPlayback.extend(moves)
+        self.autoPlaybackDue = time.perf_counter()
+        if not self.fastForward:
+            self.finish_auto_complete()
+
+    def advance_auto_complete(self):
+        # move every card whose turn has come, however many frames were missed
+        if not self.autoPlayback:
+            return
+        now = time.perf_counter()
+        while self.autoPlayback and now >= self.autoPlaybackDue:
+            self.apply_move(self.autoPlayback.popleft())
+            self.autoPlaybackDue += self.autoPlaybackInterval
+
+    def finish_auto_complete(self):
+        while self.autoPlayback:
+            self.apply_move(self.autoPlayback.popleft())
+
+    def transfer(self, source, target, count):
+        cards = source.pile[-count:]
+        del source.pile[-count:]
+        # the stock is turned over when cards go to or come from it
+        if self.stockPile in (source, target):
+            cards.reverse()
+        target.pile.extend(cards)
+        source.update()
+        target.update()
+
+    def apply_move(self, move):
+        source = self.allPiles[move.source]
+        self.transfer(source, self.allPiles[move.target], move.count)
+        if move.flipped:
+            source.pile[-1].faceUp = True
+
+    def revert_move(self, move):
+        source = self.allPiles[move.source]
+        if move.flipped:
+            source.pile[-1].faceUp = False
+        self.transfer(self.allPiles[move.target], source, move.count)
+
+    def capture_state(self):
+        # compact snapshot of every pile (card ids and face-up flags), for restore_state
+        return tuple(pile.get_state() for pile in self.allPiles)
+
+    def restore_state(self, state):
+        """Lay out a capture_state snapshot by rebinding the game's cards (no new objects)."""
+        self.finish_auto_complete()
+        for pile, pileState in zip(self.allPiles, state):
+            pile.set_state(pileState, self.cards)
+        self.engine = Engine.fromPiles(self.allPiles)
+        self.moveIndex.rebuild(self.engine)
+        self.analysisDirty = True
+        self.renderer.invalidate()
+
+    def checkpoint_state(self):
+        # taken by the history every checkpointInterval moves; the engine is
+        # already up to date while the piles may still be playing an auto-complete
+        return self.moveCount, self.engine.copy()
+
+    def rewind(self):
+        # undo past the oldest logged move: jump back to the last checkpoint before it
+        checkpoint = self.history.rewind()
+        if checkpoint is None:
+            return
+        self.moveCount, engine = checkpoint
+        self.engine = engine.copy()
+        self.lay_out_engine()
+        self.moveIndex.rebuild(self.engine)
+        self.analysisDirty = True
+        self.changeCount += 1
+        self.renderer.invalidate()
+        # the moves skipped over are gone, so the replay cannot follow
+        if self.replay:
+            self.replay.close()
+            self.replay = None
 
     def undo(self):
-        if len(self.undo_stack) > 1:
-            current_state = self.undo_stack.pop()
-            self.redo_stack.append(current_state)
-
-            previous_state = self.undo_stack[-1]
-            self.load_state(previous_state)
-
-    
-    def get_current_state(self):
-        return {
-            "piles": [pile.get_state() for pile in self.piles],
-            "foundations": [pile.get_state() for pile in self.foundationPiles],
-            "stock": self.stockPile.get_state(),
-            "waste": self.wastePile.get_state(),
-            "moveCount": self.moveCount
-        }
-
-
+        self.finish_auto_complete()
+        entry = self.history.undo()
+        if entry is None:
+            self.rewind()
+        else:
+            self.analysisDirty = True
+            self.changeCount += 1
+            for move in reversed(movesOf(entry)):
+                self.revert_move(move)
+                self.engine.undo(move)
+                self.moveIndex.moved(move)
+                self.moveCount -= 1
+                if self.replay:
+                    self.replay.write(move, UNDO)
 
-    
     def redo(self):
-        if self.redo_stack:
-
-            current_state = {
-                "piles": [pile.get_state() for pile in self.piles],
-                "foundations": [pile.get_state() for pile in self.foundationPiles],
-                "stock": self.stockPile.get_state(),
-                "waste": self.wastePile.get_state(),
-                "moveCount": self.moveCount
-            }
-
-            self.undo_stack.append(current_state)
-
-            next_state = self.redo_stack.pop()
-            self.load_state(next_state)
-
-    
-
-
+        self.finish_auto_complete()
+        entry = self.history.redo()
+        if entry:
+            self.analysisDirty = True
+            self.changeCount += 1
+            for move in movesOf(entry):
+                self.apply_move(move)
+                self.engine.apply(move)
+                self.moveIndex.moved(move)
+                self.moveCount += 1
+                if self.replay:
+                    self.replay.write(move, REDO)
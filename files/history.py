@@ -0,0 +1,128 @@
+from collections import namedtuple, deque
+
+# --------------------move/command log for undo and redo---------------------#
+# a move takes `count` cards from the top of the source pile and puts them on the
+# target pile; `flipped` records whether the newly exposed source card was turned up.
+# piles are referred to by index (tableau 0-6, foundations 7-10, stock 11, waste 12)
+Move = namedtuple("Move", "source target count flipped")
+
+class Batch(tuple):
+    """Moves logged, undone and redone as a single entry (e.g. an auto-complete)."""
+    __slots__ = ()
+
+def movesOf(entry):
+    # the moves of a log entry in the order they were played
+    return entry if isinstance(entry, Batch) else (entry,)
+
+class History:
+    # Moves beyond `limit` are dropped from the front of the log. With a
+    # checkpoint interval, a snapshot from `capture()` is also kept every
+    # `checkpointInterval` moves (at most `maxCheckpoints` of them), so once the
+    # log is undone to its first move, rewind() can still go back further: to
+    # the newest checkpoint before it, as a single step that cannot be redone.
+    def __init__(self, limit=None, checkpointInterval=None, capture=None, maxCheckpoints=16):
+        # maximum number of undoable moves kept (None = unbounded)
+        self.limit = limit
+        self.checkpointInterval = checkpointInterval if capture else None
+        self.capture = capture
+        self.maxCheckpoints = maxCheckpoints
+
+        self.undoStack = deque()
+        self.redoStack = []
+        # absolute number of the first move still in the log
+        self.baseIndex = 0
+        # (absolute move number, snapshot) pairs, oldest first
+        self.checkpoints = deque()
+
+    def clear(self):
+        self.undoStack.clear()
+        self.redoStack.clear()
+        self.checkpoints.clear()
+        self.baseIndex = 0
+
+    def load(self, undoMoves, redoMoves, baseIndex=0):
+        # restore a saved log (redoMoves in stack order, next to redo last)
+        self.clear()
+        self.undoStack.extend(undoMoves)
+        self.redoStack.extend(redoMoves)
+        self.baseIndex = baseIndex
+        if self.limit is not None and len(self.undoStack) > self.limit:
+            self.compact()
+
+    def __len__(self):
+        return len(self.undoStack)
+
+    @property
+    def position(self):
+        # absolute number of moves applied since the game started
+        return self.baseIndex + len(self.undoStack)
+
+    def canUndo(self):
+        return bool(self.undoStack)
+
+    def canRedo(self):
+        return bool(self.redoStack)
+
+    def canRewind(self):
+        return not self.undoStack and self.rewindTarget() is not None
+
+    def push(self, move):
+        # a new move invalidates the redo branch and any checkpoints taken on it
+        if self.redoStack:
+            self.redoStack.clear()
+            self.dropCheckpointsAfter(self.position)
+        self.undoStack.append(move)
+        if self.checkpointInterval and self.position % self.checkpointInterval == 0:
+            self.checkpoints.append((self.position, self.capture()))
+            if len(self.checkpoints) > self.maxCheckpoints:
+                self.checkpoints.popleft()
+        if self.limit is not None and len(self.undoStack) > self.limit:
+            self.compact()
+
+    def compact(self):
+        # drop the oldest moves until the log is within the limit
+        while len(self.undoStack) > self.limit:
+            self.undoStack.popleft()
+            self.baseIndex += 1
+
+    def dropCheckpointsAfter(self, position):
+        while self.checkpoints and self.checkpoints[-1][0] > position:
+            self.checkpoints.pop()
+
+    def rewindTarget(self):
+        # newest checkpoint taken before the first move still in the log
+        for checkpoint in reversed(self.checkpoints):
+            if checkpoint[0] < self.baseIndex:
+                return checkpoint
+        return None
+
+    def rewind(self):
+        """Go back past the start of an emptied log to the newest checkpoint before it.
+
+        Returns the snapshot to restore (None if there is none). The moves in
+        between were dropped, so the redo log is cleared.
+        """
+        checkpoint = None if self.undoStack else self.rewindTarget()
+        if checkpoint is None:
+            return None
+        position, snapshot = checkpoint
+        self.redoStack.clear()
+        self.dropCheckpointsAfter(position)
+        self.baseIndex = position
+        return snapshot
+
+    def undo(self):
+        """Pop the last move; the caller applies its inverse."""
+        if not self.undoStack:
+            return None
+        move = self.undoStack.pop()
+        self.redoStack.append(move)
+        return move
+
+    def redo(self):
+        """Pop the last undone move; the caller applies it again."""
+        if not self.redoStack:
+            return None
+        move = self.redoStack.pop()
+        self.undoStack.append(move)
+        return move
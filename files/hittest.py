@@ -0,0 +1,72 @@
+from .cards import Card
+
+# --------------------spatial hit-test index---------------------#
+# Piles never move sideways, so the window is cut into vertical strips and each
+# strip lists the piles whose column overlaps it (at most three with this
+# layout: strip 2 holds tableau piles 0 and 1 and the waste pile). A point is
+# then resolved to a card with one strip lookup and the layout arithmetic of
+# those piles (Pile.cardIndexAt), whatever the depth of the piles.
+class HitTestIndex:
+    def __init__(self, stripWidth=Card.width):
+        self.stripWidth = stripWidth
+        self.strips = {}
+        # strips each pile is registered in, so it can be moved or removed
+        self.pileStrips = {}
+        # piles cards may be dropped on
+        self.dropPiles = set()
+
+    def clear(self):
+        self.strips.clear()
+        self.pileStrips.clear()
+        self.dropPiles.clear()
+
+    def add(self, pile, dropTarget=True):
+        if dropTarget:
+            self.dropPiles.add(pile)
+        first = pile.posX // self.stripWidth
+        last = (pile.posX + Card.width - 1) // self.stripWidth
+        self.pileStrips[pile] = range(first, last + 1)
+        for strip in self.pileStrips[pile]:
+            self.strips.setdefault(strip, []).append(pile)
+
+    def remove(self, pile):
+        self.dropPiles.discard(pile)
+        for strip in self.pileStrips.pop(pile, ()):
+            self.strips[strip].remove(pile)
+
+    def update(self, pile):
+        """Re-register a pile after its position changed."""
+        dropTarget = pile in self.dropPiles
+        self.remove(pile)
+        self.add(pile, dropTarget)
+
+    def pilesAt(self, x):
+        return self.strips.get(x // self.stripWidth, ())
+
+    def cardAt(self, x, y):
+        """(pile, card index) under the point, or None."""
+        for pile in self.pilesAt(x):
+            index = pile.cardIndexAt(x, y)
+            if index is not None:
+                return pile, index
+        return None
+
+    def pileAt(self, x, y):
+        # pile whose cards or empty slot are under the point (for hover and touch)
+        hit = self.cardAt(x, y)
+        if hit:
+            return hit[0]
+        for pile in self.pilesAt(x):
+            if not pile.pile and pile.emptyPileRect.collidepoint(x, y):
+                return pile
+        return None
+
+    def dropTargets(self, rect):
+        """Piles whose top card or empty slot overlaps a dragged rect."""
+        targets = []
+        for strip in range(rect.left // self.stripWidth, (rect.right - 1) // self.stripWidth + 1):
+            for pile in self.strips.get(strip, ()):
+                if (pile in self.dropPiles and pile not in targets
+                        and rect.colliderect(pile.topRect())):
+                    targets.append(pile)
+        return targets
@@ -0,0 +1,123 @@
+from .history import Move
+from .engine import (tableauPiles, foundationPiles, stockIndex, wasteIndex, pileCount,
+                     tableauChildren, foundationNext, cardNumbers)
+
+# --------------------incremental legal-move index---------------------#
+# For every card, the piles that would accept it right now, plus where the
+# face-up run of each tableau pile starts. A move only changes its source and
+# target piles, so only their entries are refreshed; every query is then a
+# table lookup instead of a scan of the whole table.
+class MoveIndex:
+    def __init__(self):
+        # tableau piles whose top card each card may be placed on
+        self.tableauAccepts = [set() for _ in range(52)]
+        # foundation waiting for each card (None if no foundation wants it)
+        self.foundationNeeds = [None] * 52
+        self.emptyTableau = set()
+        self.emptyFoundations = set()
+        # top card of every pile as indexed (None when empty)
+        self.tops = [None] * pileCount
+        self.engine = None
+
+    def rebuild(self, engine):
+        self.engine = engine
+        for accepts in self.tableauAccepts:
+            accepts.clear()
+        self.foundationNeeds = [None] * 52
+        self.emptyTableau.clear()
+        self.emptyFoundations.clear()
+        self.tops = [None] * pileCount
+        for pile in range(pileCount):
+            self.refresh(pile)
+
+    def refresh(self, pile):
+        """Re-index one pile after its top card changed."""
+        cards = self.engine.piles[pile]
+        top = cards[-1] if cards else None
+        old = self.tops[pile]
+        if pile in tableauPiles:
+            if old is None:
+                self.emptyTableau.discard(pile)
+            else:
+                for child in tableauChildren[old]:
+                    self.tableauAccepts[child].discard(pile)
+            if top is None:
+                self.emptyTableau.add(pile)
+            else:
+                for child in tableauChildren[top]:
+                    self.tableauAccepts[child].add(pile)
+        elif pile in foundationPiles:
+            if old is None:
+                self.emptyFoundations.discard(pile)
+            elif foundationNext[old] is not None:
+                self.foundationNeeds[foundationNext[old]] = None
+            if top is None:
+                self.emptyFoundations.add(pile)
+            elif foundationNext[top] is not None:
+                self.foundationNeeds[foundationNext[top]] = pile
+        self.tops[pile] = top
+
+    def moved(self, move):
+        # call after the engine applied or undid `move`
+        self.refresh(move.source)
+        self.refresh(move.target)
+
+    def foundationFor(self, card):
+        """Foundation that takes `card` next, or None."""
+        if cardNumbers[card] == 1:
+            return min(self.emptyFoundations) if self.emptyFoundations else None
+        return self.foundationNeeds[card]
+
+    def tableauFor(self, card):
+        """Tableau piles `card` (with anything on it) can be placed on."""
+        if cardNumbers[card] == 13:
+            return self.emptyTableau
+        return self.tableauAccepts[card]
+
+    def targetsFor(self, card, count=1):
+        # drop targets for a run of `count` cards led by `card`
+        targets = list(self.tableauFor(card))
+        if count == 1:
+            foundation = self.foundationFor(card)
+            if foundation is not None:
+                targets.append(foundation)
+        return targets
+
+    def runStart(self, pile):
+        """Index of the first face-up card of a tableau pile."""
+        return self.engine.hidden[pile]
+
+    def flips(self, pile, start):
+        # whether moving the cards from `start` up turns over a hidden card
+        return pile in tableauPiles and start > 0 and start == self.engine.hidden[pile]
+
+    def hint(self):
+        """A useful move, best first: to a foundation, one that turns up a card,
+        from the waste, then drawing from the stock. None when stuck."""
+        piles = self.engine.piles
+        for pile in tuple(tableauPiles) + (wasteIndex,):
+            if piles[pile]:
+                foundation = self.foundationFor(piles[pile][-1])
+                if foundation is not None:
+                    return Move(pile, foundation, 1, self.flips(pile, len(piles[pile]) - 1))
+
+        for pile in tableauPiles:
+            start = self.runStart(pile)
+            if start < len(piles[pile]):
+                card = piles[pile][start]
+                # a king already at the bottom of its pile gains nothing by moving
+                if start == 0 and cardNumbers[card] == 13:
+                    continue
+                for target in self.tableauFor(card):
+                    if target != pile:
+                        return Move(pile, target, len(piles[pile]) - start, self.flips(pile, start))
+
+        if piles[wasteIndex]:
+            for target in self.tableauFor(piles[wasteIndex][-1]):
+                return Move(wasteIndex, target, 1, False)
+
+        if piles[stockIndex]:
+            return Move(stockIndex, wasteIndex, 1, False)
+        if piles[wasteIndex]:
+            return Move(wasteIndex, stockIndex, len(piles[wasteIndex]), False)
+        return None
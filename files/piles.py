@@ -1,25 +1,33 @@
 import pygame
-from .utils import loadImage
+from .utils import LazyImage
 from .cards import Card
+from .engine import canStackOnTableau, canStackOnFoundation
 # pile class containing cards
 class Pile:
     # pile and card spacing to define gaps between cards
     cardSpacing = 30
     pileSpacing = 140
+    # vertical offset between cards of this kind of pile (0 = squared up)
+    fanSpacing = cardSpacing
 
-    # set empty pile image
-    emptyPileImage = loadImage(f"{Card.imagePath}/empty_pile_slot.png", Card.size)
+    # set empty pile image (loaded on first use)
+    emptyPileImage = LazyImage(f"{Card.imagePath}/empty_pile_slot.png", Card.size, (30, 110, 50))
 
     def __init__(self, pile=None, posX=0, posY=0):
         self.posX = posX
         self.posY = posY
         self.pile = pile if pile is not None else []
         self.emptyPileRect = pygame.Rect(posX, posY, Card.size[0], Card.size[1])
+        # set whenever the pile needs to be redrawn
+        self.dirty = True
+        # (colour, rect) outline drawn over the pile, e.g. a drop target or a hint
+        self.highlight = None
 
     def update(self):
         self.emptyPileRect = pygame.Rect(
             self.posX, self.posY, Card.size[0], Card.size[1]
         )
+        self.dirty = True
 
         for index, card in enumerate(self.pile):
             card.rect.x = self.posX
@@ -43,18 +51,65 @@ class Pile:
         else: 
             # draw empty pile image
             screen.blit(Pile.emptyPileImage, self.emptyPileRect)
+        if self.highlight:
+            colour, rect = self.highlight
+            pygame.draw.rect(screen, colour, rect, 3, border_radius=6)
+
+    def setHighlight(self, colour, index=None):
+        """Outline the card at `index` (the top card or empty slot by default); None clears it."""
+        if colour is None:
+            if self.highlight:
+                self.highlight = None
+                self.dirty = True
+            return
+        rect = self.pile[index].rect.copy() if index is not None else self.topRect()
+        self.highlight = (colour, rect)
+        self.dirty = True
+
+    def cardIndexAt(self, x, y):
+        """Index of the card drawn at (x, y), from the pile geometry alone."""
+        if not self.pile or not 0 <= x - self.posX < Card.width:
+            return None
+        offset = y - self.posY
+        if offset < 0:
+            return None
+        last = len(self.pile) - 1
+        index = min(offset // self.fanSpacing, last) if self.fanSpacing else last
+        if offset >= index * self.fanSpacing + Card.height:
+            return None
+        return index
+
+    def topRect(self):
+        # where the top card (or the empty slot) is drawn: the drop target area
+        if not self.pile:
+            return self.emptyPileRect
+        return pygame.Rect(self.posX, self.posY + (len(self.pile) - 1) * self.fanSpacing,
+                           Card.width, Card.height)
+
+    def bounds(self):
+        """Screen area covered by the pile (or its empty slot)."""
+        if self.pile:
+            return self.emptyPileRect.union(self.pile[-1].rect)
+        return self.emptyPileRect
     
     def get_state(self):
-        """Return a representation of the pile's state."""
-        return [{'number': card.number, 'suit': card.suit, 'faceUp': card.faceUp} for card in self.pile]
-
-    def set_state(self, state):
-        """Load a saved state into the pile."""
-        self.pile = [Card(card['number'], card['suit'], card['faceUp']) for card in state]
+        """Return the pile's state: the ids of its cards and their face-up flags."""
+        return tuple(card.id for card in self.pile), tuple(card.faceUp for card in self.pile)
+
+    def set_state(self, state, cards):
+        """Load a state from get_state into the pile, rebinding the game's `cards` (see cardSet)."""
+        ids, faceUp = state
+        self.pile[:] = [cards[card] for card in ids]
+        for card, up in zip(self.pile, faceUp):
+            card.faceUp = up
+        self.update()
 
 # Contains the remaining cards after setting up the tableau
 class StockPile(Pile):
+    fanSpacing = 0
+
     def update(self):
+        self.dirty = True
         # update positions of the cards when being placed back in to stock pile
         for card in self.pile:
             card.faceUp = False
@@ -64,15 +119,17 @@ class StockPile(Pile):
     def get_state(self):
         return super().get_state()  # Or add custom behavior if needed
 
-    def set_state(self, state):
-        super().set_state(state)  # Or add custom behavior if needed
+    def set_state(self, state, cards):
+        super().set_state(state, cards)  # Or add custom behavior if needed
 
 # Contains the card(s) pulled from the stock
 class WastePile(Pile):
+    fanSpacing = 0
+
     # move cards to waste pile when mouse button is pressed
-    def handleMouseDown(self, stockPile):
+    def handleMouseDown(self, stockPile, mousePos=None):
         # get mouse position
-        mouseX, mouseY = pygame.mouse.get_pos()
+        mouseX, mouseY = mousePos or pygame.mouse.get_pos()
         
         if stockPile.emptyPileRect.collidepoint(mouseX, mouseY): 
             if stockPile.pile:
@@ -80,17 +137,20 @@ class WastePile(Pile):
                 self.pile.append(stockPile.pile.pop())
                 self.pile[-1].faceUp = True
                 self.update()
+                stockPile.dirty = True
 
             else:
                 # return waste pile to stock pile
                 self.pile.reverse()
                 stockPile.pile = list(self.pile)
                 self.pile.clear()
+                self.dirty = True
                 stockPile.update()
 
     # overwrite update method
     def update(self):
-    # update positions of the cards
+        self.dirty = True
+        # update positions of the cards
         for card in self.pile:
             card.faceUp = True
             card.rect.x = self.posX
@@ -99,13 +159,14 @@ class WastePile(Pile):
     def get_state(self):
         return super().get_state()  # Or add custom behavior if needed
 
-    def set_state(self, state):
-        super().set_state(state)  # Or add custom behavior if needed
+    def set_state(self, state, cards):
+        super().set_state(state, cards)  # Or add custom behavior if needed
 
 # completing 4 of these piles (1 for each suit) will win the game
 class FoundationPile(WastePile):
     # overwrite update method
     def update(self):
+        self.dirty = True
         # update positions of the cards
         for card in self.pile:
             card.rect.x = self.posX
@@ -114,60 +175,103 @@ class FoundationPile(WastePile):
     def get_state(self):
         return super().get_state()  # Or add custom behavior if needed
 
-    def set_state(self, state):
-        super().set_state(state)  # Or add custom behavior if needed
+    def set_state(self, state, cards):
+        super().set_state(state, cards)  # Or add custom behavior if needed
 
 # When pile is being dragged by cursor
 class MovingPile(Pile):
+    # drop shadow offset and colour
+    shadowOffset = 6
+    shadowColour = (0, 0, 0, 60)
+    # longest run that can be dragged (King down to Ace)
+    maxCards = 13
+
     # inherit pile class
     def __init__(self):
         Pile.__init__(self)
+        # the dragged cards and their shadows are composed into one surface at
+        # pick-up, so dragging costs one blit per frame and no allocations
+        self.dragSurface = None
+        self.dragArea = pygame.Rect(0, 0, 0, 0)
+        self.shadowImage = None
         # keep track of mouse positions
         self.prevMouseX = 0
         self.prevMouseY = 0
         # keep track of previous pile object
         self.previousPile = None
+        # whether the last drop turned up the card left behind
+        self.flipped = False
 
-    def handleMouseDown(self, pile):
+    def handleMouseDown(self, pile, mousePos=None):
         # get current mouse position
-        mouseX, mouseY = pygame.mouse.get_pos()
-
-        # check if cursor is inside any of the cards in the pile (starting from last card)
-        for index, card in reversed(list(enumerate(pile.pile))):
-            # if mouse is inside card
-            if card.rect.collidepoint(mouseX, mouseY) and card.faceUp: 
-                # partition pile into moving pile
-                self.pile = pile.pile[index:]
-                pile.pile = pile.pile[:index]
-                self.previousPile = pile
-                
-                # set moving pile position to the card
-                self.posX = card.rect.x
-                self.posY = card.rect.y
-
-                # track position of mouse
-                self.prevMouseX = mouseX
-                self.prevMouseY = mouseY
-
-                return
-
-    def handleMouseMotion(self):
+        mouseX, mouseY = mousePos or pygame.mouse.get_pos()
+
+        # find the card under the cursor from the pile layout (independent of pile depth)
+        index = pile.cardIndexAt(mouseX, mouseY)
+        if index is None:
+            return
+        card = pile.pile[index]
+        if card.faceUp:
+            # partition pile into moving pile
+            self.pile = pile.pile[index:]
+            pile.pile = pile.pile[:index]
+            self.previousPile = pile
+            pile.dirty = True
+            self.dirty = True
+
+            # set moving pile position to the card
+            self.posX = card.rect.x
+            self.posY = card.rect.y
+            self.composeDragSurface()
+
+            # track position of mouse
+            self.prevMouseX = mouseX
+            self.prevMouseY = mouseY
+
+    def composeDragSurface(self):
+        # both buffers are allocated once, sized for the longest possible run
+        if self.dragSurface is None:
+            offset = MovingPile.shadowOffset
+            self.dragSurface = pygame.Surface(
+                (Card.width + offset, (MovingPile.maxCards - 1) * Pile.cardSpacing + Card.height + offset),
+                pygame.SRCALPHA)
+            self.shadowImage = pygame.Surface(Card.size, pygame.SRCALPHA)
+            self.shadowImage.fill(MovingPile.shadowColour)
+
+        self.dragArea.size = (Card.width + MovingPile.shadowOffset,
+                              (len(self.pile) - 1) * Pile.cardSpacing + Card.height + MovingPile.shadowOffset)
+        self.dragSurface.fill((0, 0, 0, 0), self.dragArea)
+        for index, card in enumerate(self.pile):
+            y = index * Pile.cardSpacing
+            self.dragSurface.blit(self.shadowImage, (MovingPile.shadowOffset, y + MovingPile.shadowOffset))
+            self.dragSurface.blit(card.imageBuffer, (0, y))
+
+    def leadRect(self):
+        # where the first dragged card currently is (used to find drop targets)
+        return pygame.Rect(self.posX, self.posY, Card.width, Card.height)
+
+    def handleMouseMotion(self, mousePos=None):
         # move card with cursor if held
-        mouseX, mouseY = pygame.mouse.get_pos()
+        mouseX, mouseY = mousePos or pygame.mouse.get_pos()
         
-        # move pile based on previous position of mouse
+        # move pile based on previous position of mouse; the cards themselves
+        # are only repositioned when they are dropped
         self.posX += mouseX - self.prevMouseX
         self.posY += mouseY - self.prevMouseY
-        self.update()
+        self.dirty = True
 
         self.prevMouseX = mouseX
         self.prevMouseY = mouseY
 
 
     def handleMouseUp(self, piles):
+        # returns the pile the cards were dropped on, or None if they went back
+        self.flipped = False
         if not self.pile:
-            return False
+            return None
 
+        # break the dragged surface back into cards at the drop position
+        self.update()
         moving_card = self.pile[0]
         target_pile = None
 
@@ -176,37 +280,32 @@ class MovingPile(Pile):
         # ----------------------------
         for pile in piles:
 
+            # dropping back where the cards came from is not a move
+            if pile is self.previousPile:
+                continue
+
+            if not moving_card.rect.colliderect(pile.topRect()):
+                continue
+
             # NON EMPTY PILE
             if pile.pile:
                 top_card = pile.pile[-1]
-
-                if moving_card.rect.colliderect(top_card.rect):
-
-                    # FOUNDATION RULE (ascending same suit)
-                    if isinstance(pile, FoundationPile):
-                        if (moving_card.suit == top_card.suit and
-                            moving_card.number == top_card.number + 1):
-                            target_pile = pile
-
-                    # TABLEAU RULE (descending opposite color)
-                    else:
-                        if (moving_card.isOppositeColourTo(top_card) and
-                            moving_card.number == top_card.number - 1):
-                            target_pile = pile
+                if not top_card.faceUp:
+                    continue
+                top = top_card.id
 
             # EMPTY PILE
             else:
-                if moving_card.rect.colliderect(pile.emptyPileRect):
+                top = None
 
-                    # FOUNDATION: only Ace
-                    if isinstance(pile, FoundationPile):
-                        if moving_card.number == 1:
-                            target_pile = pile
+            # FOUNDATION RULE (single card, ascending same suit, Ace first)
+            if isinstance(pile, FoundationPile):
+                if len(self.pile) == 1 and canStackOnFoundation(moving_card.id, top):
+                    target_pile = pile
 
-                    # TABLEAU: only King
-                    else:
-                        if moving_card.number == 13:
-                            target_pile = pile
+            # TABLEAU RULE (descending opposite color, King first)
+            elif canStackOnTableau(moving_card.id, top):
+                target_pile = pile
 
         # ----------------------------
         # APPLY MOVE
@@ -226,9 +325,12 @@ class MovingPile(Pile):
                 top = self.previousPile.pile[-1]
                 if not top.faceUp:
                     top.faceUp = True
+                    self.flipped = True
+                    self.previousPile.dirty = True
 
             self.pile.clear()
-            return True
+            self.dirty = True
+            return target_pile
 
         # ----------------------------
         # INVALID MOVE → RETURN BACK
@@ -239,7 +341,8 @@ class MovingPile(Pile):
                 self.previousPile.update()
 
             self.pile.clear()
-            return False
+            self.dirty = True
+            return None
 
 
 
@@ -248,19 +351,18 @@ class MovingPile(Pile):
     def get_state(self):
         return super().get_state()  # Or add custom behavior if needed
 
-    def set_state(self, state):
-        super().set_state(state)  # Or add custom behavior if needed
+    def set_state(self, state, cards):
+        super().set_state(state, cards)  # Or add custom behavior if needed
+
+    def bounds(self):
+        # cards plus their drop shadow; nothing while not dragging
+        if not self.pile:
+            return None
+        return pygame.Rect(self.posX, self.posY, self.dragArea.width, self.dragArea.height)
 
     def draw(self, screen):
         if self.pile:
-            for card in self.pile:
-                # Draw shadow
-                shadow = pygame.Surface(Card.size, pygame.SRCALPHA)
-                shadow.fill((0, 0, 0, 60))
-                screen.blit(shadow, (card.rect.x + 6, card.rect.y + 6))
-
-                # Draw card
-                card.draw(screen)
+            screen.blit(self.dragSurface, (self.posX, self.posY), self.dragArea)
 
 
     
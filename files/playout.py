@@ -0,0 +1,32 @@
+from .engine import tableauPiles, foundationPiles
+
+# --------------------random playouts on the headless engine---------------------#
+def playoutMoves(engine):
+    # legal moves without the ones that can only undo progress
+    piles = engine.piles
+    moves = []
+    for move in engine.legal_moves():
+        source, target, count, flipped = move
+        if source in foundationPiles:
+            continue
+        if source in tableauPiles and count == len(piles[source]) and not piles[target]:
+            continue
+        moves.append(move)
+    return moves
+
+def randomPlayout(engine, rng, maxMoves=1000):
+    """Play random moves (foundation moves and flips first) until won or stuck.
+
+    `engine` is modified in place. Returns (won, number of moves played).
+    """
+    for played in range(maxMoves):
+        if engine.isWon():
+            return True, played
+        moves = playoutMoves(engine)
+        if not moves:
+            return False, played
+        best = [move for move in moves if move.target in foundationPiles]
+        if not best:
+            best = [move for move in moves if move.flipped]
+        engine.apply(rng.choice(best or moves))
+    return engine.isWon(), maxMoves
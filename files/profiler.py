@@ -0,0 +1,188 @@
+import json
+import time
+from array import array
+from collections import deque
+import pygame
+
+# --------------------per-phase frame profiler---------------------#
+# phases in the order a frame runs them
+phaseNames = ("events", "victory check", "background", "tableau", "foundations",
+              "stock/waste", "moving pile", "status bar", "flip")
+(EVENTS, VICTORY, BACKGROUND, TABLEAU, FOUNDATIONS,
+ STOCK_WASTE, MOVING, STATUS, FLIP) = range(len(phaseNames))
+phaseCount = len(phaseNames)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class FrameProfiler:
+    # Keeps the last `capacity` frames in fixed-size ring buffers, so recording
+    # allocates nothing; while disabled every call returns straight away.
+    def __init__(self, capacity=600, enabled=False):
+        self.enabled = enabled
+        # whether the current frame is being recorded (enabling takes effect next frame)
+        self.active = False
+        self.capacity = capacity
+        # per frame and phase: offset of the phase start and its duration (seconds)
+        self.starts = array('d', bytes(8 * capacity * phaseCount))
+        self.durations = array('d', bytes(8 * capacity * phaseCount))
+        self.frameStarts = array('d', bytes(8 * capacity))
+        self.frames = 0
+        self.slot = 0
+        self.frameStart = 0.0
+        self.last = 0.0
+        # input events waiting for the next flip, and (event time, latency) pairs
+        self.pendingInput = []
+        self.latencies = deque(maxlen=capacity)
+
+    def beginFrame(self):
+        self.active = self.enabled
+        if not self.active:
+            return
+        self.frameStart = self.last = time.perf_counter()
+        index = self.frames % self.capacity
+        self.frameStarts[index] = self.frameStart
+        self.slot = index * phaseCount
+        for phase in range(self.slot, self.slot + phaseCount):
+            self.durations[phase] = 0.0
+
+    def mark(self, phase):
+        """Charge the time since the previous mark to `phase`."""
+        if not self.active:
+            return
+        now = time.perf_counter()
+        slot = self.slot + phase
+        if not self.durations[slot]:
+            self.starts[slot] = self.last - self.frameStart
+        self.durations[slot] += now - self.last
+        self.last = now
+        if phase == FLIP and self.pendingInput:
+            for eventTime in self.pendingInput:
+                self.latencies.append((eventTime, now - eventTime))
+            self.pendingInput.clear()
+
+    def endFrame(self):
+        if self.active:
+            self.frames += 1
+
+    def inputEvent(self, received=None):
+        # a mouse event was taken off the queue at `received` (perf_counter,
+        # now if not given); its latency ends at the next flip
+        if self.active:
+            self.pendingInput.append(time.perf_counter() if received is None else received)
+
+    def recordedFrames(self):
+        # ring buffer indices, oldest first
+        count = min(self.frames, self.capacity)
+        first = self.frames - count
+        return [frame % self.capacity for frame in range(first, self.frames)]
+
+    def frameTimes(self):
+        """Work time of each recorded frame in milliseconds, oldest first."""
+        return [sum(self.durations[index * phaseCount:(index + 1) * phaseCount]) * 1000
+                for index in self.recordedFrames()]
+
+    def phaseTimes(self, phase):
+        return [self.durations[index * phaseCount + phase] * 1000 for index in self.recordedFrames()]
+
+    def summary(self, phases=False):
+        times = self.frameTimes()
+        latencies = [latency * 1000 for _, latency in self.latencies]
+        summary = {
+            "frames": len(times),
+            "p50": percentile(times, 0.50),
+            "p95": percentile(times, 0.95),
+            "p99": percentile(times, 0.99),
+            "input_p95": percentile(latencies, 0.95),
+        }
+        if phases:
+            summary["phases_p95"] = {name: percentile(self.phaseTimes(phase), 0.95)
+                                     for phase, name in enumerate(phaseNames)}
+        return summary
+
+    def exportTrace(self, path):
+        """Write the recorded frames as Chrome trace-event JSON (chrome://tracing, Perfetto)."""
+        events = []
+        origin = None
+        for index in self.recordedFrames():
+            frameStart = self.frameStarts[index]
+            if origin is None:
+                origin = frameStart
+            base = index * phaseCount
+            for phase, name in enumerate(phaseNames):
+                duration = self.durations[base + phase]
+                if duration:
+                    events.append({"name": name, "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+                                   "ts": (frameStart + self.starts[base + phase] - origin) * 1e6,
+                                   "dur": duration * 1e6})
+        for eventTime, latency in self.latencies:
+            if origin is not None and eventTime >= origin:
+                events.append({"name": "input to flip", "cat": "input", "ph": "X", "pid": 1, "tid": 2,
+                               "ts": (eventTime - origin) * 1e6, "dur": latency * 1e6})
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+        return len(events)
+
+class ProfilerOverlay:
+    # in-game panel with frame-time percentiles and a sparkline; drawn through
+    # the dirty-rectangle renderer like the piles
+    size = (300, 110)
+    budget = 1000 / 60
+    # seconds between refreshes while shown
+    refreshInterval = 0.1
+
+    def __init__(self, profiler, posX, posY, font):
+        self.profiler = profiler
+        self.rect = pygame.Rect((posX, posY), self.size)
+        # its own font and rendered lines: the figures change every refresh and
+        # would only churn the shared textCache
+        self.font = font
+        self.lineSurfaces = {}
+        self.visible = False
+        self.dirty = False
+        self.lastRefresh = 0.0
+
+    def update(self):
+        # ask the renderer for a redraw a few times per second while shown
+        now = time.perf_counter()
+        if self.visible and now - self.lastRefresh >= self.refreshInterval:
+            self.lastRefresh = now
+            self.dirty = True
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.dirty = True
+
+    def bounds(self):
+        return self.rect if self.visible else None
+
+    def renderLine(self, row, line):
+        # re-rendered only when the figures on that line change
+        shown = self.lineSurfaces.get(row)
+        if shown is None or shown[0] != line:
+            shown = self.lineSurfaces[row] = (line, self.font.render(line, True, (255, 255, 255)))
+        return shown[1]
+
+    def draw(self, screen):
+        if not self.visible:
+            return
+        pygame.draw.rect(screen, (0, 0, 0), self.rect)
+        summary = self.profiler.summary()
+        lines = (f"frame ms p50 {summary['p50']:.2f}  p95 {summary['p95']:.2f}  p99 {summary['p99']:.2f}",
+                 f"input to flip p95 {summary['input_p95']:.2f} ms")
+        for row, line in enumerate(lines):
+            screen.blit(self.renderLine(row, line), (self.rect.x + 6, self.rect.y + 4 + row * 16))
+
+        # sparkline of recent frame times, scaled so the 16 ms budget sits mid-height
+        times = self.profiler.frameTimes()[-(self.rect.width - 12):]
+        bottom = self.rect.bottom - 6
+        height = self.rect.height - 46
+        budgetY = bottom - height // 2
+        pygame.draw.line(screen, (120, 40, 40), (self.rect.x + 6, budgetY), (self.rect.right - 6, budgetY))
+        for x, value in enumerate(times):
+            top = bottom - min(height, int(value / self.budget * height / 2))
+            colour = (220, 80, 80) if value > self.budget else (80, 220, 80)
+            pygame.draw.line(screen, colour, (self.rect.x + 6 + x, bottom), (self.rect.x + 6 + x, top))
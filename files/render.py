@@ -0,0 +1,140 @@
+import sys
+import pygame
+from .constants import screenSize
+from .profiler import BACKGROUND, TABLEAU, FOUNDATIONS, STOCK_WASTE, MOVING, STATUS, VICTORY, FLIP
+
+# --------------------retained-mode dirty-rectangle renderer---------------------#
+def buildBackground(size):
+    # vertical gradient, drawn once instead of on every frame; the colour
+    # steps every 20 rows, so it is filled a band at a time, straight into
+    # the display's pixel format when there is a window
+    display = pygame.display.get_surface()
+    background = pygame.Surface(size, 0, display) if display is not None else pygame.Surface(size)
+    for y in range(0, size[1], 20):
+        color = (
+            20,
+            90 + y // 20,
+            40
+        )
+        background.fill(color, (0, y, size[0], 20))
+    return background
+
+def mergeRects(rects):
+    # combine overlapping regions so each area is repainted only once
+    merged = []
+    for rect in rects:
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect = rect.union(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+class Renderer:
+    def __init__(self, screen):
+        self.screen = screen
+        self.screenRect = screen.get_rect()
+        self.background = buildBackground(screenSize)
+        # last area drawn for each object, so its old position can be cleared
+        self.lastBounds = {}
+        self.lastStatus = None
+        self.fullRedraw = True
+
+    def invalidate(self):
+        """Repaint the whole window on the next frame (reset, victory, ...)."""
+        self.fullRedraw = True
+        self.lastBounds.clear()
+
+    def collectDirty(self, game):
+        rects = []
+        for drawable in game.drawables():
+            if not drawable.dirty:
+                continue
+            drawable.dirty = False
+            old = self.lastBounds.get(drawable)
+            new = drawable.bounds()
+            if old:
+                rects.append(old)
+            if new:
+                rects.append(new)
+            self.lastBounds[drawable] = new
+
+        status = game.status_key()
+        if status != self.lastStatus:
+            self.lastStatus = status
+            rects.append(game.statusBarRect)
+        return rects
+
+    def render(self, game):
+        """Redraw only the changed regions. Returns the rects pushed to the display."""
+        rects = self.collectDirty(game)
+        if self.fullRedraw:
+            self.fullRedraw = False
+            rects = [self.screenRect]
+        elif not rects:
+            return rects
+        else:
+            rects = mergeRects([rect.clip(self.screenRect) for rect in rects])
+
+        # draw layer by layer (each clipped to the dirty regions) so the
+        # profiler can charge every layer separately
+        screen = self.screen
+        mark = game.profiler.mark
+        for rect in rects:
+            screen.set_clip(rect)
+            screen.blit(self.background, rect, rect)
+        mark(BACKGROUND)
+        self.drawPiles(rects, game.piles)
+        mark(TABLEAU)
+        self.drawPiles(rects, game.foundationPiles)
+        mark(FOUNDATIONS)
+        self.drawPiles(rects, (game.stockPile, game.wastePile))
+        mark(STOCK_WASTE)
+        if game.movingPile.pile:
+            for rect in rects:
+                screen.set_clip(rect)
+                game.movingPile.draw(screen)
+        mark(MOVING)
+        for rect in rects:
+            screen.set_clip(rect)
+            if rect.colliderect(game.statusBarRect):
+                game.draw_status_bar()
+            if game.profilerOverlay.visible and rect.colliderect(game.profilerOverlay.rect):
+                game.profilerOverlay.draw(screen)
+            if game.statsPanel and game.statsPanel.visible and rect.colliderect(game.statsPanel.rect):
+                game.statsPanel.draw(screen)
+        mark(STATUS)
+        if game.victory:
+            for rect in rects:
+                screen.set_clip(rect)
+                game.display_victory_message()
+            mark(VICTORY)
+        screen.set_clip(None)
+
+        if rects[0] is self.screenRect:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        mark(FLIP)
+        return rects
+
+    def drawPiles(self, rects, piles):
+        screen = self.screen
+        for rect in rects:
+            screen.set_clip(rect)
+            for pile in piles:
+                if rect.colliderect(pile.bounds()):
+                    pile.draw(screen)
+
+# backends selectable with --renderer
+backends = ("surface", "texture")
+
+def createRenderer(backend="surface"):
+    """A Renderer for `backend`; "texture" falls back to surfaces where SDL's renderer is unavailable."""
+    if backend == "texture":
+        try:
+            from .texrender import TextureRenderer
+            return TextureRenderer()
+        except (ImportError, pygame.error) as error:
+            print(f"texture renderer unavailable ({error}); drawing with surfaces", file=sys.stderr)
+    return Renderer(pygame.display.set_mode(screenSize))
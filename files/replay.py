@@ -0,0 +1,214 @@
+import argparse
+import os
+import struct
+import sys
+import time
+from .history import Move
+from .engine import (Engine, tableauPiles, foundationPiles, stockIndex, wasteIndex, pileCount,
+                     canStackOnTableau, canStackOnFoundation)
+
+# --------------------compact binary replay log---------------------#
+# One file per game: a 76-byte header with the deal, then one 8-byte record per
+# move, undo or redo, appended (and flushed) as it happens. Records are fixed
+# width, so a file can be streamed through the headless Engine without parsing:
+#   python -m files.replay replays/ --workers 8
+magic = b"SOLREPLY"
+version = 1
+header = struct.Struct("<8sHHId52s")        # magic, version, record size, deal number, start time, deck order
+record = struct.Struct("<BBBBI")            # source, target, count, flags, ms since the previous record
+noDealNumber = 0xFFFFFFFF
+
+# record flags
+FLIPPED = 1
+UNDO = 2
+REDO = 4
+
+def replayName(dealNumber):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return f"{stamp}-{'custom' if dealNumber is None else dealNumber}.rpl"
+
+class ReplayWriter:
+    def __init__(self, path, order, dealNumber=None):
+        self.path = path
+        self.file = open(path, "wb")
+        self.last = time.time()
+        self.file.write(header.pack(magic, version, record.size,
+                                    noDealNumber if dealNumber is None else dealNumber,
+                                    self.last, bytes(order)))
+        self.file.flush()
+
+    def write(self, move, flags=0):
+        now = time.time()
+        delta = min(int((now - self.last) * 1000), 0xFFFFFFFF)
+        self.last = now
+        if move.flipped:
+            flags |= FLIPPED
+        self.file.write(record.pack(move.source, move.target, move.count, flags, delta))
+        # flushed per move so a crash loses nothing; moves arrive at human speed
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class ReplayReader:
+    """Streams a replay file: header fields up front, then (move, kind, delta ms) per record."""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        data = self.file.read(header.size)
+        if len(data) < header.size:
+            raise ValueError(f"{path} is too short for a replay")
+        fileMagic, fileVersion, recordSize, dealNumber, self.started, order = header.unpack(data)
+        if fileMagic != magic or fileVersion != version or recordSize != record.size:
+            raise ValueError(f"{path} is not a version {version} replay")
+        self.dealNumber = None if dealNumber == noDealNumber else dealNumber
+        self.order = list(order)
+
+    def __iter__(self):
+        while True:
+            data = self.file.read(record.size * 512)
+            # a trailing partial record (interrupted write) is ignored
+            for source, target, count, flags, delta in record.iter_unpack(
+                    data[:len(data) - len(data) % record.size]):
+                kind = 1 if flags & UNDO else 2 if flags & REDO else 0
+                yield Move(source, target, count, bool(flags & FLIPPED)), kind, delta
+            if len(data) < record.size * 512:
+                return
+
+    def close(self):
+        self.file.close()
+
+def isLegalMove(engine, move):
+    # the same rules the game enforces on a drop or a stock click
+    piles = engine.piles
+    source, target, count, flipped = move
+    if source >= len(piles) or target >= len(piles) or source == target:
+        return False
+    pile = piles[source]
+    if not 0 < count <= len(pile):
+        return False
+    if source == stockIndex:
+        return target == wasteIndex and count == 1 and not flipped
+    if target == stockIndex:
+        return source == wasteIndex and not piles[stockIndex] and count == len(pile) and not flipped
+    if source in tableauPiles:
+        down = engine.hidden[source]
+        if len(pile) - count < down or flipped != (down > 0 and len(pile) - count == down):
+            return False
+    elif count != 1 or flipped:
+        return False
+    top = piles[target][-1] if piles[target] else None
+    if target in foundationPiles:
+        return count == 1 and canStackOnFoundation(pile[-1], top)
+    if target in tableauPiles:
+        return canStackOnTableau(pile[-count], top)
+    return False
+
+def replayGame(path):
+    """Replay one file through the Engine and return its summary."""
+    reader = ReplayReader(path)
+    engine = Engine.deal(reader.order)
+    # undo records must take back the last applied move, redo records the last undone one
+    applied = []
+    undone = []
+    stats = {"path": path, "deal": reader.dealNumber, "moves": 0, "undos": 0, "redos": 0,
+             "won": False, "valid": True, "duration": 0.0,
+             # moves made from each pile to each pile, indexed source * pileCount + target
+             "pairs": [0] * (pileCount * pileCount)}
+    try:
+        for move, kind, delta in reader:
+            stats["duration"] += delta / 1000
+            if kind == 0:
+                if not isLegalMove(engine, move):
+                    stats["valid"] = False
+                    break
+                engine.apply(move)
+                applied.append(move)
+                undone.clear()
+                stats["moves"] += 1
+                stats["pairs"][move.source * pileCount + move.target] += 1
+            elif kind == 1:
+                if not applied or applied.pop() != move:
+                    stats["valid"] = False
+                    break
+                engine.undo(move)
+                undone.append(move)
+                stats["undos"] += 1
+            else:
+                if not undone or undone.pop() != move:
+                    stats["valid"] = False
+                    break
+                engine.apply(move)
+                applied.append(move)
+                stats["redos"] += 1
+    finally:
+        reader.close()
+    stats["won"] = engine.isWon()
+    return stats
+
+def replayFiles(paths):
+    return [replayGame(path) for path in paths]
+
+def collectPaths(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, name) for name in sorted(os.listdir(item))
+                         if name.endswith(".rpl"))
+        else:
+            paths.append(item)
+    return paths
+
+def pileName(index):
+    if index in tableauPiles:
+        return f"tableau {index + 1}"
+    if index in foundationPiles:
+        return f"foundation {index - 6}"
+    return "stock" if index == stockIndex else "waste"
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m files.replay",
+                                     description="Replay recorded games headlessly and summarise them.")
+    parser.add_argument("inputs", nargs="+", help=".rpl files or directories of them")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes")
+    parser.add_argument("--chunk", type=int, default=200, help="files per pool task")
+    parser.add_argument("--top", type=int, default=10, help="most common moves to list")
+    parser.add_argument("--list", action="store_true", help="print one line per game")
+    return parser.parse_args(argv)
+
+def runReplays(args):
+    # imported here so that recording games does not pay for it at startup
+    import multiprocessing
+    paths = collectPaths(args.inputs)
+    tasks = [paths[first:first + args.chunk] for first in range(0, len(paths), args.chunk)]
+    started = time.perf_counter()
+    if args.workers > 1:
+        with multiprocessing.Pool(args.workers) as pool:
+            results = [stats for chunk in pool.imap(replayFiles, tasks) for stats in chunk]
+    else:
+        results = [stats for chunk in map(replayFiles, tasks) for stats in chunk]
+    elapsed = time.perf_counter() - started
+
+    pairs = [0] * (pileCount * pileCount)
+    for stats in results:
+        pairs = [total + count for total, count in zip(pairs, stats["pairs"])]
+        if args.list:
+            print(f"{stats['path']}: deal {stats['deal']}, {stats['moves']} moves, "
+                  f"{stats['undos']} undos, {stats['duration']:.0f}s, "
+                  f"{'won' if stats['won'] else 'lost'}{'' if stats['valid'] else ', INVALID'}")
+    games = len(results)
+    won = sum(stats["won"] for stats in results)
+    moves = sum(stats["moves"] for stats in results)
+    print(f"{games} games, {won} won, {sum(not stats['valid'] for stats in results)} invalid")
+    if games:
+        print(f"{moves / games:.1f} moves, {sum(stats['undos'] for stats in results) / games:.1f} undos "
+              f"and {sum(stats['duration'] for stats in results) / games:.0f}s per game")
+    common = sorted(range(len(pairs)), key=pairs.__getitem__, reverse=True)[:args.top]
+    for pair in common:
+        if pairs[pair]:
+            print(f"  {pileName(pair // pileCount)} -> {pileName(pair % pileCount)}: {pairs[pair]}")
+    print(f"replayed in {elapsed:.2f}s ({games / max(elapsed, 1e-9):.0f} games/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    runReplays(parseArgs())
@@ -0,0 +1,185 @@
+import os
+import struct
+import threading
+from array import array
+from .history import Move, Batch, movesOf
+from .replay import isLegalMove
+from .engine import Engine, pileCount, tableauPiles
+
+# --------------------compact save files---------------------#
+# A save is the engine position (13 piles of card ids and the face-down counts)
+# plus the undo/redo log at 4 bytes per move, a few hundred bytes in all:
+#   header, 13 pile lengths, the cards of every pile in order, hidden counts,
+#   then the undo moves (oldest first) and the redo moves (next to redo last)
+magic = b"SOLSAVE\0"
+version = 2
+# version 1 files (no batches) are still read
+readableVersions = (1, 2)
+header = struct.Struct("<8sHHIIdIII")       # magic, version, reserved, deal number, move count,
+                                            # elapsed seconds, history base, undo moves, redo moves
+moveRecord = struct.Struct("<BBBB")         # source, target, count, flags
+# move record flags
+FLIPPED = 1
+# the next record belongs to the same history entry (a Batch)
+CONTINUED = 2
+noDealNumber = 0xFFFFFFFF
+
+def encodeEntries(entries):
+    records = []
+    for entry in entries:
+        moves = movesOf(entry)
+        last = len(moves) - 1
+        records.extend(moveRecord.pack(source, target, count,
+                                       (FLIPPED if flipped else 0) | (CONTINUED if index < last else 0))
+                       for index, (source, target, count, flipped) in enumerate(moves))
+    return records
+
+def decodeEntries(data, count):
+    entries = []
+    batch = []
+    for source, target, moveCount, flags in moveRecord.iter_unpack(data[:count * moveRecord.size]):
+        batch.append(Move(source, target, moveCount, bool(flags & FLIPPED)))
+        if not flags & CONTINUED:
+            entries.append(batch[0] if len(batch) == 1 else Batch(batch))
+            batch = []
+    if batch:
+        raise ValueError("unfinished batch in save file")
+    return entries
+
+class SaveData:
+    def __init__(self, engine, dealNumber, moveCount, elapsed, undoMoves, redoMoves, historyBase=0):
+        self.engine = engine
+        self.dealNumber = dealNumber
+        self.moveCount = moveCount
+        self.elapsed = elapsed
+        self.undoMoves = undoMoves
+        self.redoMoves = redoMoves
+        self.historyBase = historyBase
+
+def encodeSave(save):
+    engine = save.engine
+    undoRecords = encodeEntries(save.undoMoves)
+    redoRecords = encodeEntries(save.redoMoves)
+    parts = [header.pack(magic, version, 0,
+                         noDealNumber if save.dealNumber is None else save.dealNumber,
+                         save.moveCount, save.elapsed, save.historyBase,
+                         len(undoRecords), len(redoRecords)),
+             bytes(len(pile) for pile in engine.piles)]
+    parts.extend(pile.tobytes() for pile in engine.piles)
+    parts.append(engine.hidden.tobytes())
+    parts.extend(undoRecords)
+    parts.extend(redoRecords)
+    return b"".join(parts)
+
+def hiddenCountsValid(engine):
+    # only tableau piles hold face-down cards, and never all of a pile's cards
+    for index, (down, pile) in enumerate(zip(engine.hidden, engine.piles)):
+        if index in tableauPiles:
+            if down and down >= len(pile):
+                return False
+        elif down:
+            return False
+    return True
+
+def historyValid(engine, undoEntries, redoEntries):
+    # every logged move must be legal where it was played: the undo log is taken
+    # back from the saved position and the redo log played forward from it
+    position = engine.copy()
+    for entry in reversed(undoEntries):
+        for move in reversed(movesOf(entry)):
+            source, target, count, _ = move
+            if not (source < pileCount and target < pileCount and 0 < count <= len(position.piles[target])):
+                return False
+            position.undo(move)
+            if not isLegalMove(position, move):
+                return False
+    position = engine.copy()
+    for entry in reversed(redoEntries):
+        for move in movesOf(entry):
+            if not isLegalMove(position, move):
+                return False
+            position.apply(move)
+    return True
+
+def decodeSave(data):
+    fileMagic, fileVersion, _, dealNumber, moveCount, elapsed, historyBase, undoCount, redoCount = \
+        header.unpack_from(data, 0)
+    if fileMagic != magic or fileVersion not in readableVersions:
+        raise ValueError("not a readable save file")
+    offset = header.size
+    lengths = data[offset:offset + pileCount]
+    offset += pileCount
+    engine = Engine()
+    for index, length in enumerate(lengths):
+        engine.piles[index] = array('B', data[offset:offset + length])
+        offset += length
+    engine.hidden = array('B', data[offset:offset + pileCount])
+    offset += pileCount
+    end = offset + (undoCount + redoCount) * moveRecord.size
+    if len(data) < end or sum(lengths) != 52:
+        raise ValueError("truncated save file")
+    if sorted(card for pile in engine.piles for card in pile) != list(range(52)):
+        raise ValueError("save file does not hold each card once")
+    if not hiddenCountsValid(engine):
+        raise ValueError("impossible face-down counts in save file")
+    undoEntries = decodeEntries(data[offset:], undoCount)
+    redoEntries = decodeEntries(data[offset + undoCount * moveRecord.size:], redoCount)
+    if not historyValid(engine, undoEntries, redoEntries):
+        raise ValueError("illegal move in save file history")
+    return SaveData(engine, None if dealNumber == noDealNumber else dealNumber, moveCount, elapsed,
+                    undoEntries, redoEntries, historyBase)
+
+def writeAtomic(path, data):
+    # a crash mid-write leaves the previous save intact
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, path)
+
+def loadSave(path):
+    """SaveData from `path`, or None if there is no usable save."""
+    try:
+        with open(path, "rb") as file:
+            return decodeSave(file.read())
+    except (OSError, ValueError, struct.error):
+        return None
+
+class SaveWriter:
+    # Writes saves on a background thread so the disk never stalls a frame.
+    # Only the newest pending snapshot is kept: a slow disk skips stale saves.
+    def __init__(self, path):
+        self.path = path
+        self.pending = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.loop, name="autosave", daemon=True)
+        self.thread.start()
+
+    def submit(self, data):
+        with self.condition:
+            self.pending = data
+            self.condition.notify()
+
+    def loop(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                data, self.pending = self.pending, None
+                if data is None:
+                    return
+            try:
+                writeAtomic(self.path, data)
+            except OSError:
+                pass
+
+    def close(self, data=None):
+        """Write `data` (or whatever is pending) and stop the thread."""
+        with self.condition:
+            if data is not None:
+                self.pending = data
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
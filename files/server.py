@@ -0,0 +1,296 @@
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from .history import History, Move
+from .engine import Engine, tableauPiles, pileCount, shuffledDeck, dealCount
+from .replay import isLegalMove
+
+# --------------------multi-session game server---------------------#
+# Hosts many headless games (Engine plus a bounded undo log each) in one
+# asyncio process, for bots and thin clients. The protocol is one ASCII line
+# per request and one per reply, over TCP or a Unix socket; requests may be
+# pipelined and sessions outlive connections:
+#   NEW [deal]                    -> OK <session> <deal>
+#   MOVES <session>               -> OK <source>:<target>:<count> ...
+#   MOVE <session> <src> <dst> <count>  -> OK <moves> <won>
+#   UNDO <session>                -> OK <moves>
+#   STATE <session>               -> OK <deal> <moves> <won> <face-down counts> <pile>,...,<pile>
+#   CLOSE <session>               -> OK
+#   STATS                         -> OK <sessions> <requests> <evicted>
+# Piles are numbered like the move log (tableau 0-6, foundations 7-10, stock 11,
+# waste 12); in STATE each pile is its card ids (0-51) as hex bytes, bottom
+# first, or "-" when empty. Errors reply ERR <reason>.
+#   python main.py --serve 127.0.0.1:7777
+#   python -m files.server --bench 127.0.0.1:7777 --clients 50
+class Session:
+    __slots__ = ("engine", "history", "dealNumber", "moveCount", "lastUsed")
+
+    def __init__(self, dealNumber, historyLimit):
+        self.engine = Engine.deal(shuffledDeck(dealNumber))
+        self.history = History(historyLimit)
+        self.dealNumber = dealNumber
+        self.moveCount = 0
+        self.lastUsed = time.monotonic()
+
+class ProtocolError(Exception):
+    pass
+
+def formatState(session):
+    engine = session.engine
+    piles = ",".join(pile.tobytes().hex() or "-" for pile in engine.piles)
+    hidden = "".join(str(down) for down in engine.hidden[:7])
+    return f"{session.dealNumber} {session.moveCount} {int(engine.isWon())} {hidden} {piles}"
+
+class GameServer:
+    def __init__(self, maxSessions=10000, historyLimit=500, idleTimeout=600.0):
+        # sessions by id, least recently used first
+        self.sessions = OrderedDict()
+        self.nextSession = 1
+        self.maxSessions = maxSessions
+        # undo entries kept per session, which bounds its memory
+        self.historyLimit = historyLimit
+        # seconds a session may go unused before it is evicted
+        self.idleTimeout = idleTimeout
+        self.requests = 0
+        self.evicted = 0
+        self.commands = {"NEW": self.new, "MOVES": self.moves, "MOVE": self.move, "UNDO": self.undo,
+                         "STATE": self.state, "CLOSE": self.close, "STATS": self.stats}
+
+    def session(self, arguments):
+        if not arguments:
+            raise ProtocolError("missing session")
+        session = self.sessions.get(arguments[0])
+        if session is None:
+            raise ProtocolError("unknown session")
+        session.lastUsed = time.monotonic()
+        self.sessions.move_to_end(arguments[0])
+        return session
+
+    def evictIdle(self):
+        # the least recently used sessions come first, so stop at the first live one
+        cutoff = time.monotonic() - self.idleTimeout
+        while self.sessions:
+            key, session = next(iter(self.sessions.items()))
+            if session.lastUsed > cutoff:
+                break
+            del self.sessions[key]
+            self.evicted += 1
+
+    def new(self, arguments):
+        if len(self.sessions) >= self.maxSessions:
+            self.evictIdle()
+            if len(self.sessions) >= self.maxSessions:
+                raise ProtocolError("too many sessions")
+        dealNumber = int(arguments[0]) if arguments else random.randrange(dealCount)
+        if not 0 <= dealNumber < dealCount:
+            raise ProtocolError("bad deal number")
+        key = str(self.nextSession)
+        self.nextSession += 1
+        self.sessions[key] = Session(dealNumber, self.historyLimit)
+        return f"{key} {dealNumber}"
+
+    def moves(self, arguments):
+        return " ".join(f"{source}:{target}:{count}"
+                        for source, target, count, _ in self.session(arguments).engine.legal_moves())
+
+    def move(self, arguments):
+        session = self.session(arguments)
+        if len(arguments) != 4:
+            raise ProtocolError("usage: MOVE <session> <source> <target> <count>")
+        source, target, count = (int(argument) for argument in arguments[1:])
+        if not (0 <= source < pileCount and 0 <= target < pileCount):
+            raise ProtocolError("bad pile")
+        engine = session.engine
+        # the card under the moved ones is turned up if it was the last face-down one
+        flipped = (source in tableauPiles and 0 <= count <= len(engine.piles[source])
+                   and len(engine.piles[source]) - count == engine.hidden[source] > 0)
+        move = Move(source, target, count, flipped)
+        if not isLegalMove(engine, move):
+            raise ProtocolError("illegal move")
+        engine.apply(move)
+        session.history.push(move)
+        session.moveCount += 1
+        return f"{session.moveCount} {int(engine.isWon())}"
+
+    def undo(self, arguments):
+        session = self.session(arguments)
+        move = session.history.undo()
+        if move is None:
+            raise ProtocolError("nothing to undo")
+        # a new move drops the redo branch anyway; keep memory to the undo log
+        session.history.redoStack.clear()
+        session.engine.undo(move)
+        session.moveCount -= 1
+        return str(session.moveCount)
+
+    def state(self, arguments):
+        return formatState(self.session(arguments))
+
+    def close(self, arguments):
+        self.session(arguments)
+        del self.sessions[arguments[0]]
+        return ""
+
+    def stats(self, arguments):
+        return f"{len(self.sessions)} {self.requests} {self.evicted}"
+
+    def handle(self, line):
+        """Reply line (without the newline) for one request line."""
+        self.requests += 1
+        words = line.split()
+        if not words:
+            return "ERR empty request"
+        command = self.commands.get(words[0].upper())
+        if command is None:
+            return "ERR unknown command"
+        try:
+            reply = command(words[1:])
+        except ProtocolError as error:
+            return f"ERR {error}"
+        except ValueError:
+            return "ERR bad argument"
+        return f"OK {reply}" if reply else "OK"
+
+    async def evictLoop(self):
+        while True:
+            await asyncio.sleep(min(self.idleTimeout / 4, 60))
+            self.evictIdle()
+
+    async def serve(self, address):
+        loop = asyncio.get_running_loop()
+        if isUnixAddress(address):
+            path = unixPath(address)
+            if os.path.exists(path):
+                os.unlink(path)
+            server = await loop.create_unix_server(lambda: GameProtocol(self), path)
+        else:
+            host, port = splitAddress(address)
+            server = await loop.create_server(lambda: GameProtocol(self), host, port)
+        print(f"serving on {address}", file=sys.stderr)
+        evictor = asyncio.ensure_future(self.evictLoop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+class GameProtocol(asyncio.Protocol):
+    # A plain protocol rather than streams: every request line that arrived in
+    # one read is answered with a single write, with no coroutine per request.
+    maxLine = 4096
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = b""
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        lines = (self.buffer + data).split(b"\n")
+        self.buffer = lines.pop()
+        if len(self.buffer) > self.maxLine:
+            self.transport.close()
+            return
+        if lines:
+            handle = self.server.handle
+            self.transport.write("".join(handle(line.decode("ascii", "replace")) + "\n"
+                                         for line in lines).encode())
+
+def isUnixAddress(address):
+    return address.startswith("unix:") or "/" in address
+
+def unixPath(address):
+    return address[5:] if address.startswith("unix:") else address
+
+def splitAddress(address):
+    # "host:port" or just "port" (localhost)
+    host, _, port = address.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+async def connect(address):
+    if isUnixAddress(address):
+        return await asyncio.open_unix_connection(unixPath(address))
+    return await asyncio.open_connection(*splitAddress(address))
+
+def runServer(address, maxSessions=10000, historyLimit=500, idleTimeout=600.0):
+    server = GameServer(maxSessions, historyLimit, idleTimeout)
+    try:
+        asyncio.run(server.serve(address))
+    except KeyboardInterrupt:
+        pass
+
+# --------------------load generator---------------------#
+async def botClient(address, games, latencies, rng):
+    # plays random legal moves (with an undo now and then), one request at a time
+    reader, writer = await connect(address)
+
+    async def request(line):
+        started = time.perf_counter()
+        writer.write(line.encode() + b"\n")
+        reply = (await reader.readline()).decode().split()
+        latencies.append(time.perf_counter() - started)
+        if not reply or reply[0] != "OK":
+            raise RuntimeError(f"{line!r} failed: {' '.join(reply)}")
+        return reply[1:]
+
+    won = 0
+    for _ in range(games):
+        session = (await request(f"NEW {rng.randrange(dealCount)}"))[0]
+        for _ in range(200):
+            moves = await request(f"MOVES {session}")
+            if not moves:
+                break
+            if rng.random() < 0.05:
+                try:
+                    await request(f"UNDO {session}")
+                except RuntimeError:
+                    pass
+                continue
+            reply = await request(f"MOVE {session} {rng.choice(moves).replace(':', ' ')}")
+            if reply[1] == "1":
+                won += 1
+                break
+        await request(f"STATE {session}")
+        await request(f"CLOSE {session}")
+    writer.close()
+    return won
+
+async def runBench(address, clients, games, seed):
+    latencies = []
+    started = time.perf_counter()
+    won = await asyncio.gather(*(botClient(address, games, latencies, random.Random(seed + client))
+                                 for client in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    count = len(latencies)
+    print(f"{clients} clients, {clients * games} games ({sum(won)} won), {count} requests "
+          f"in {elapsed:.2f}s: {count / elapsed:.0f} requests/s")
+    print(f"latency p50 {latencies[count // 2] * 1000:.3f} ms, "
+          f"p99 {latencies[int(count * 0.99)] * 1000:.3f} ms")
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m files.server",
+                                     description="Serve headless games, or load-test a server.")
+    parser.add_argument("address", help="host:port, port, or a Unix socket path (unix:PATH)")
+    parser.add_argument("--bench", action="store_true", help="run bot clients against the address")
+    parser.add_argument("--clients", type=int, default=20, help="concurrent bot connections")
+    parser.add_argument("--games", type=int, default=20, help="games per bot")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--history", type=int, default=500, help="undo entries kept per session")
+    parser.add_argument("--idle-timeout", type=float, default=600.0, help="seconds before an idle session is evicted")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parseArgs()
+    if args.bench:
+        asyncio.run(runBench(args.address, args.clients, args.games, args.seed))
+    else:
+        runServer(args.address, args.max_sessions, args.history, args.idle_timeout)
@@ -0,0 +1,178 @@
+import random
+import time
+from array import array
+from collections import namedtuple
+from .engine import (tableauPiles, foundationPiles, stockIndex, wasteIndex, pileCount,
+                     cardNumbers, cardSuits, cardIsRed)
+
+# --------------------depth-first Klondike solver---------------------#
+solved = "solved"
+unwinnable = "unwinnable"
+unknown = "unknown"
+
+# status is one of the three values above; moves is the winning line when solved
+SolveResult = namedtuple("SolveResult", "status moves nodes elapsed")
+
+# Zobrist keys: one random 64-bit value per (card, pile, position) and per
+# (pile, face-down count); a position's hash is the XOR of its keys, so a move
+# only touches the keys of the cards it carries
+slotsPerPile = 24
+_rng = random.Random(0x5011)
+zobristCards = tuple(tuple(_rng.getrandbits(64) for _ in range(pileCount * slotsPerPile))
+                     for _ in range(52))
+zobristHidden = tuple(tuple(_rng.getrandbits(64) for _ in range(8)) for _ in range(pileCount))
+
+def zobristHash(engine):
+    key = 0
+    for index, pile in enumerate(engine.piles):
+        base = index * slotsPerPile
+        for position, card in enumerate(pile):
+            key ^= zobristCards[card][base + position]
+        key ^= zobristHidden[index][engine.hidden[index]]
+    return key
+
+def zobristDelta(engine, move):
+    """Hash change caused by `move`; call before applying it."""
+    source, target, count, flipped = move
+    src = engine.piles[source]
+    srcBase = source * slotsPerPile
+    dstSlot = target * slotsPerPile + len(engine.piles[target])
+    first = len(src) - count
+    # the stock is turned over when cards go to or come from it
+    turned = source == stockIndex or target == stockIndex
+    delta = 0
+    for offset in range(count):
+        position = len(src) - 1 - offset if turned else first + offset
+        card = src[position]
+        delta ^= zobristCards[card][srcBase + position] ^ zobristCards[card][dstSlot + offset]
+    if flipped:
+        down = engine.hidden[source]
+        delta ^= zobristHidden[source][down] ^ zobristHidden[source][down - 1]
+    return delta
+
+class TranspositionTable:
+    # fixed-size table of visited position hashes; a colliding entry is simply
+    # overwritten, which can only cost a re-search, never a wrong answer
+    def __init__(self, bits=20):
+        self.mask = (1 << bits) - 1
+        self.slots = array('Q', bytes(8 << bits))
+        self.evictions = 0
+
+    def __contains__(self, key):
+        return self.slots[key & self.mask] == key
+
+    def add(self, key):
+        index = key & self.mask
+        if self.slots[index] not in (0, key):
+            self.evictions += 1
+        self.slots[index] = key
+
+def foundationRanks(engine):
+    # highest rank on the foundation of each suit (0 when empty)
+    ranks = [0, 0, 0, 0]
+    for f in foundationPiles:
+        pile = engine.piles[f]
+        if pile:
+            ranks[cardSuits[pile[-1]]] = cardNumbers[pile[-1]]
+    return ranks
+
+def isSafeFoundationCard(card, ranks):
+    # no tableau card could ever need this card to build on: both foundations
+    # of the other colour already hold the cards that would go on it
+    number = cardNumbers[card]
+    if number <= 2:
+        return True
+    red = cardIsRed[card]
+    others = [ranks[suit] for suit in range(4) if (suit in (1, 2)) != red]
+    return min(others) >= number - 1
+
+class Solver:
+    def __init__(self, maxNodes=200000, timeLimit=5.0, tableBits=20):
+        self.maxNodes = maxNodes
+        self.timeLimit = timeLimit
+        self.tableBits = tableBits
+
+    def orderedMoves(self, engine):
+        moves = engine.legal_moves()
+        ranks = foundationRanks(engine)
+        piles = engine.piles
+        hidden = engine.hidden
+        scored = []
+        for move in moves:
+            source, target, count, flipped = move
+            if target in foundationPiles:
+                card = piles[source][-1]
+                # a safe move to the foundation never hurts: play it alone
+                if isSafeFoundationCard(card, ranks):
+                    return [move]
+                score = 80
+            elif source in tableauPiles and target in tableauPiles:
+                if count == len(piles[source]) and not piles[target]:
+                    # moving a whole pile to an empty pile changes nothing
+                    continue
+                if flipped:
+                    score = 70 + hidden[source]
+                elif count == len(piles[source]):
+                    score = 60
+                else:
+                    score = 10
+            elif source == wasteIndex and target in tableauPiles:
+                score = 50
+            elif source == stockIndex or target == stockIndex:
+                score = 20
+            else:
+                # back from the foundation
+                score = 0
+            if flipped and target in foundationPiles:
+                score += 10
+            scored.append((score, move))
+        scored.sort(key=lambda entry: entry[0], reverse=True)
+        return [move for _, move in scored]
+
+    def solve(self, engine):
+        """Search for a winning line from `engine` (left unchanged)."""
+        start = time.perf_counter()
+        deadline = start + self.timeLimit if self.timeLimit else None
+        engine = engine.copy()
+        table = TranspositionTable(self.tableBits)
+        key = zobristHash(engine)
+        table.add(key)
+
+        nodes = 0
+        path = []
+        keys = []
+        frames = [iter(self.orderedMoves(engine))]
+        while frames:
+            if engine.isWon():
+                return SolveResult(solved, list(path), nodes, time.perf_counter() - start)
+
+            move = next(frames[-1], None)
+            if move is None:
+                # every move from here has been tried: backtrack
+                frames.pop()
+                if path:
+                    engine.undo(path.pop())
+                    key = keys.pop()
+                continue
+
+            nextKey = key ^ zobristDelta(engine, move)
+            if nextKey in table:
+                continue
+            table.add(nextKey)
+
+            nodes += 1
+            if nodes >= self.maxNodes or (deadline and not nodes & 1023
+                                          and time.perf_counter() > deadline):
+                return SolveResult(unknown, None, nodes, time.perf_counter() - start)
+
+            engine.apply(move)
+            path.append(move)
+            keys.append(key)
+            key = nextKey
+            frames.append(iter(self.orderedMoves(engine)))
+
+        return SolveResult(unwinnable, None, nodes, time.perf_counter() - start)
+
+def solveGame(game, **limits):
+    """Solve the table currently shown by a SolitaireGame."""
+    return Solver(**limits).solve(game.engine)
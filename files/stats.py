@@ -0,0 +1,305 @@
+import argparse
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+import pygame
+from .text import textCache
+
+# --------------------persistent game statistics---------------------#
+# Every finished or abandoned game is one row of `games`; `deals` and the
+# single `totals` row hold running aggregates (games, wins, best time,
+# streaks) updated in the same transaction as the insert, so reading them
+# is one primary-key lookup however many games are recorded. All database
+# work happens on a writer thread that batches queued games into one
+# transaction and publishes fresh aggregates for the game to read.
+ABANDONED = 0
+WON = 1
+outcomeNames = ("abandoned", "won")
+
+schema = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    deal INTEGER,
+    outcome INTEGER NOT NULL REFERENCES outcomes(id),
+    finished REAL NOT NULL,
+    seconds REAL NOT NULL,
+    moves INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS games_by_deal ON games(deal, outcome);
+CREATE INDEX IF NOT EXISTS games_by_finished ON games(finished);
+CREATE INDEX IF NOT EXISTS wins_by_seconds ON games(seconds) WHERE outcome = 1;
+CREATE TABLE IF NOT EXISTS deals (
+    deal INTEGER PRIMARY KEY,
+    played INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    best_seconds REAL,
+    best_moves INTEGER);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    played INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    best_seconds REAL,
+    best_moves INTEGER,
+    streak INTEGER NOT NULL,
+    best_streak INTEGER NOT NULL);
+INSERT OR IGNORE INTO outcomes VALUES (0, 'abandoned'), (1, 'won');
+INSERT OR IGNORE INTO totals VALUES (1, 0, 0, 0, NULL, NULL, 0, 0);
+"""
+
+# a finished game as queued for the writer
+GameRecord = namedtuple("GameRecord", "dealNumber outcome finished seconds moves")
+
+class StatsSummary(namedtuple("StatsSummary", "played won seconds bestSeconds bestMoves streak bestStreak")):
+    __slots__ = ()
+
+    @property
+    def winRate(self):
+        return self.won / self.played if self.played else 0.0
+
+DealStats = namedtuple("DealStats", "dealNumber played won bestSeconds bestMoves")
+
+def openDatabase(path):
+    connection = sqlite3.connect(path)
+    # write-ahead logging: readers never wait on the writer, and a commit is
+    # one append instead of a rewrite of the journal
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(schema)
+    return connection
+
+def minimum(first, second):
+    # min() that ignores a missing value
+    if first is None:
+        return second
+    return first if second is None else min(first, second)
+
+def recordGames(connection, games):
+    """Insert `games` (GameRecords, oldest first) and fold them into the aggregates."""
+    connection.executemany("INSERT INTO games (deal, outcome, finished, seconds, moves) VALUES (?, ?, ?, ?, ?)",
+                           games)
+    connection.executemany(
+        "INSERT INTO deals VALUES (?, 1, ?, ?, ?) ON CONFLICT(deal) DO UPDATE SET "
+        "played = played + 1, won = won + excluded.won, "
+        "best_seconds = coalesce(min(best_seconds, excluded.best_seconds), best_seconds, excluded.best_seconds), "
+        "best_moves = coalesce(min(best_moves, excluded.best_moves), best_moves, excluded.best_moves)",
+        [(game.dealNumber, game.outcome,
+          game.seconds if game.outcome == WON else None, game.moves if game.outcome == WON else None)
+         for game in games if game.dealNumber is not None])
+
+    played, won, seconds, bestSeconds, bestMoves, streak, bestStreak = readTotals(connection)
+    for game in games:
+        played += 1
+        seconds += game.seconds
+        if game.outcome == WON:
+            won += 1
+            bestSeconds = minimum(bestSeconds, game.seconds)
+            bestMoves = minimum(bestMoves, game.moves)
+            streak += 1
+            bestStreak = max(bestStreak, streak)
+        else:
+            streak = 0
+    connection.execute("UPDATE totals SET played = ?, won = ?, seconds = ?, best_seconds = ?, best_moves = ?, "
+                       "streak = ?, best_streak = ? WHERE id = 1",
+                       (played, won, seconds, bestSeconds, bestMoves, streak, bestStreak))
+
+def readTotals(connection):
+    return StatsSummary(*connection.execute(
+        "SELECT played, won, seconds, best_seconds, best_moves, streak, best_streak FROM totals WHERE id = 1"
+    ).fetchone())
+
+def readDeal(connection, dealNumber):
+    row = connection.execute("SELECT played, won, best_seconds, best_moves FROM deals WHERE deal = ?",
+                             (dealNumber,)).fetchone()
+    return DealStats(dealNumber, *row) if row else DealStats(dealNumber, 0, 0, None, None)
+
+def recentGames(connection, limit=10):
+    return connection.execute("SELECT deal, outcome, finished, seconds, moves FROM games "
+                              "ORDER BY finished DESC LIMIT ?", (limit,)).fetchall()
+
+def scanTotals(connection):
+    # the aggregates computed from every row, for checking the stored ones
+    return connection.execute("SELECT count(*), count(*) FILTER (WHERE outcome = 1), total(seconds), "
+                              "min(seconds) FILTER (WHERE outcome = 1) FROM games").fetchone()
+
+class StatsStore:
+    # Owns the database on a writer thread: the game only queues records and
+    # reads `summary` / `dealStats`, plain values the thread replaces after
+    # every batch, so no frame ever touches the disk.
+    def __init__(self, path, batchSize=512):
+        self.path = path
+        self.batchSize = batchSize
+        self.requests = queue.Queue()
+        self.summary = None
+        # aggregates for the deal passed to watchDeal
+        self.dealStats = None
+        # bumped whenever new values are published
+        self.version = 0
+        self.thread = threading.Thread(target=self.loop, name="stats", daemon=True)
+        self.thread.start()
+
+    def record(self, dealNumber, won, seconds, moves):
+        self.requests.put(GameRecord(dealNumber, WON if won else ABANDONED, time.time(), seconds, moves))
+
+    def watchDeal(self, dealNumber):
+        """Publish the aggregates of this deal from now on (None for none)."""
+        self.requests.put(("deal", dealNumber))
+
+    def loop(self):
+        try:
+            connection = openDatabase(self.path)
+        except sqlite3.Error:
+            connection = None
+        watched = None
+        stop = False
+        while not stop:
+            # whatever queued up while the last batch was written goes in one transaction
+            batch = [self.requests.get()]
+            while len(batch) < self.batchSize:
+                try:
+                    batch.append(self.requests.get_nowait())
+                except queue.Empty:
+                    break
+            games = []
+            for request in batch:
+                if request is None:
+                    stop = True
+                elif isinstance(request, GameRecord):
+                    games.append(request)
+                else:
+                    watched = request[1]
+            if connection is None:
+                continue
+            try:
+                if games:
+                    with connection:
+                        recordGames(connection, games)
+                self.summary = readTotals(connection)
+                self.dealStats = None if watched is None else readDeal(connection, watched)
+                self.version += 1
+            except sqlite3.Error:
+                pass
+        if connection is not None:
+            connection.close()
+
+    def close(self):
+        """Write everything queued and stop the thread."""
+        self.requests.put(None)
+        self.thread.join()
+
+def formatSeconds(seconds):
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    return f"{seconds // 60:02}:{seconds % 60:02}"
+
+def formatMoves(moves):
+    return "-" if moves is None else str(moves)
+
+class StatsPanel:
+    # in-game panel (F5) with the stored aggregates; drawn through the
+    # dirty-rectangle renderer like the profiler overlay
+    size = (300, 110)
+
+    def __init__(self, store, posX, posY):
+        self.store = store
+        self.rect = pygame.Rect((posX, posY), self.size)
+        self.visible = False
+        self.dirty = False
+        self.shownVersion = None
+
+    def update(self):
+        # redraw when the writer thread has published new aggregates
+        if self.visible and self.store.version != self.shownVersion:
+            self.dirty = True
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.dirty = True
+
+    def bounds(self):
+        return self.rect if self.visible else None
+
+    def lines(self):
+        summary = self.store.summary
+        if summary is None:
+            return ("Loading statistics...",)
+        lines = [f"Games {summary.played}  won {summary.won} ({summary.winRate:.0%})",
+                 f"Best time {formatSeconds(summary.bestSeconds)}  fewest moves {formatMoves(summary.bestMoves)}",
+                 f"Win streak {summary.streak}  longest {summary.bestStreak}"]
+        deal = self.store.dealStats
+        if deal is not None:
+            lines.append(f"Deal {deal.dealNumber}: played {deal.played}  won {deal.won}  "
+                         f"best {formatSeconds(deal.bestSeconds)}")
+        return lines
+
+    def draw(self, screen):
+        if not self.visible:
+            return
+        self.shownVersion = self.store.version
+        pygame.draw.rect(screen, (0, 0, 0), self.rect)
+        for row, line in enumerate(self.lines()):
+            screen.blit(textCache.render(line, 20, (255, 255, 255)),
+                        (self.rect.x + 6, self.rect.y + 6 + row * 24))
+
+# --------------------command line---------------------#
+def showStats(args):
+    connection = openDatabase(args.path)
+    summary = readTotals(connection)
+    print(f"games {summary.played}, won {summary.won} ({summary.winRate:.1%}), "
+          f"played for {formatSeconds(summary.seconds)}")
+    print(f"best time {formatSeconds(summary.bestSeconds)}, fewest moves {formatMoves(summary.bestMoves)}, "
+          f"streak {summary.streak} (longest {summary.bestStreak})")
+    for deal, outcome, finished, seconds, moves in recentGames(connection, args.recent):
+        print(f"  {time.strftime('%Y-%m-%d %H:%M', time.localtime(finished))}  deal {deal}  "
+              f"{outcomeNames[outcome]:9}  {formatSeconds(seconds)}  {moves} moves")
+
+def timeQuery(query, repeat=200):
+    # best of `repeat` runs, in milliseconds
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+def benchStats(args):
+    # fill a scratch database through the writer thread, then time the reads the panel makes
+    if os.path.exists(args.path):
+        raise SystemExit(f"{args.path} exists; --bench needs a new file")
+    rng = random.Random(args.seed)
+    store = StatsStore(args.path)
+    started = time.perf_counter()
+    for _ in range(args.bench):
+        store.record(rng.randrange(1000000), rng.random() < 0.3, rng.uniform(60, 900), rng.randrange(80, 250))
+    store.close()
+    print(f"recorded {args.bench} games in {time.perf_counter() - started:.2f}s")
+
+    connection = openDatabase(args.path)
+    print(f"totals      {timeQuery(lambda: readTotals(connection)):.3f} ms")
+    print(f"one deal    {timeQuery(lambda: readDeal(connection, rng.randrange(1000000))):.3f} ms")
+    print(f"recent 10   {timeQuery(lambda: recentGames(connection)):.3f} ms")
+    print(f"full scan   {timeQuery(lambda: scanTotals(connection), 5):.3f} ms  (what the totals row saves)")
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m files.stats", description="Show recorded game statistics.")
+    parser.add_argument("path", help="statistics database (solitaire_stats.db by default in game)")
+    parser.add_argument("--recent", type=int, default=10, help="recent games to list")
+    parser.add_argument("--bench", type=int, metavar="GAMES",
+                        help="record this many random games into a new database and time the queries")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    args = parseArgs()
+    if args.bench:
+        benchStats(args)
+    else:
+        showStats(args)
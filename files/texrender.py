@@ -0,0 +1,118 @@
+import weakref
+import pygame
+from pygame._sdl2 import video
+from .constants import screenSize
+from .cards import Card
+from .piles import Pile, MovingPile
+from .render import Renderer, buildBackground
+from .text import textCache
+from .profiler import BACKGROUND, TABLEAU, FOUNDATIONS, STOCK_WASTE, MOVING, STATUS, VICTORY, FLIP
+
+# --------------------texture renderer (pygame._sdl2)---------------------#
+# Draws through an SDL renderer instead of blitting surfaces: the background,
+# every card face, the card back and the empty slot are uploaded once as
+# textures, and a frame is a run of texture copies that SDL queues and submits
+# together on present. It picks a GPU driver when there is one and SDL's
+# software renderer otherwise (SDL_RENDER_DRIVER=software forces it).
+# The status bar and the overlays are still drawn with surfaces, onto an
+# offscreen canvas (the game's `screen` here), and copied over as one texture.
+# Frames are only drawn when the dirty-rectangle bookkeeping of Renderer sees
+# a change, but each drawn frame is a full repaint: the SDL back buffer does
+# not keep its contents after present.
+class TextureRenderer(Renderer):
+    def __init__(self, title="Solitaire Classic", size=screenSize):
+        self.window = video.Window(title, size)
+        self.gpu = video.Renderer(self.window, accelerated=-1)
+        super().__init__(pygame.Surface(size))
+        self.backgroundTexture = video.Texture.from_surface(self.gpu, buildBackground(size))
+        self.canvasTexture = video.Texture(self.gpu, size, streaming=True)
+        shadow = pygame.Surface(Card.size, pygame.SRCALPHA)
+        shadow.fill(MovingPile.shadowColour)
+        self.shadowTexture = video.Texture.from_surface(self.gpu, shadow)
+        # one texture per surface shown (card faces, the back, placeholders,
+        # text), dropped together with its surface
+        self.textures = weakref.WeakKeyDictionary()
+
+    def texture(self, surface):
+        texture = self.textures.get(surface)
+        if texture is None:
+            texture = self.textures[surface] = video.Texture.from_surface(self.gpu, surface)
+        return texture
+
+    def render(self, game):
+        """Repaint the window if anything changed. Returns the rects that changed."""
+        rects = self.collectDirty(game)
+        if self.fullRedraw:
+            self.fullRedraw = False
+            rects = [self.screenRect]
+        elif not rects:
+            return rects
+
+        mark = game.profiler.mark
+        self.backgroundTexture.draw()
+        mark(BACKGROUND)
+        self.drawPiles(game.piles)
+        mark(TABLEAU)
+        self.drawPiles(game.foundationPiles)
+        mark(FOUNDATIONS)
+        self.drawPiles((game.stockPile, game.wastePile))
+        mark(STOCK_WASTE)
+        if game.movingPile.pile:
+            self.drawMovingPile(game.movingPile)
+        mark(MOVING)
+        self.drawPanel(game.statusBarRect, game.draw_status_bar)
+        for overlay in (game.profilerOverlay, game.statsPanel):
+            if overlay and overlay.visible:
+                self.drawPanel(overlay.rect, lambda: overlay.draw(self.screen))
+        mark(STATUS)
+        if game.victory:
+            self.drawVictory()
+            mark(VICTORY)
+        self.gpu.present()
+        mark(FLIP)
+        return rects
+
+    def drawPiles(self, piles):
+        texture = self.texture
+        for pile in piles:
+            if not pile.pile:
+                texture(Pile.emptyPileImage).draw(dstrect=pile.emptyPileRect)
+            elif pile.fanSpacing:
+                for card in pile.pile:
+                    texture(card.imageBuffer).draw(dstrect=card.rect)
+            else:
+                # squared-up pile: only the top card shows
+                card = pile.pile[-1]
+                texture(card.imageBuffer).draw(dstrect=card.rect)
+            if pile.highlight:
+                self.drawOutline(*pile.highlight)
+
+    def drawMovingPile(self, movingPile):
+        texture = self.texture
+        offset = MovingPile.shadowOffset
+        for index, card in enumerate(movingPile.pile):
+            position = pygame.Rect(movingPile.posX, movingPile.posY + index * Pile.cardSpacing, *card.rect.size)
+            self.shadowTexture.draw(dstrect=position.move(offset, offset))
+            texture(card.imageBuffer).draw(dstrect=position)
+
+    def drawOutline(self, colour, rect):
+        # three nested rectangles: the surface renderer's 3px outline, without the rounded corners
+        self.gpu.draw_color = pygame.Color(colour)
+        for inset in range(3):
+            self.gpu.draw_rect(rect.inflate(-2 * inset, -2 * inset))
+
+    def drawPanel(self, rect, draw):
+        # draw onto the offscreen canvas and copy that region over
+        self.screen.set_clip(rect)
+        draw()
+        self.screen.set_clip(None)
+        self.canvasTexture.update(self.screen.subsurface(rect), rect)
+        self.canvasTexture.draw(srcrect=rect, dstrect=rect)
+
+    def drawVictory(self):
+        self.gpu.draw_blend_mode = 1
+        self.gpu.draw_color = (0, 0, 0, 180)
+        self.gpu.fill_rect(self.screenRect)
+        self.gpu.draw_blend_mode = 0
+        text = textCache.render("YOU WIN!", 80, (255, 215, 0))
+        self.texture(text).draw(dstrect=text.get_rect(center=self.screenRect.center))
@@ -0,0 +1,35 @@
+from collections import OrderedDict
+import pygame
+
+# --------------------text render cache---------------------#
+class TextCache:
+    # rendered text surfaces keyed by font, size, string and colour; the least
+    # recently used entries are dropped once `capacity` is reached
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.fonts = {}
+
+    def font(self, size, name=None):
+        font = self.fonts.get((name, size))
+        if font is None:
+            font = self.fonts[(name, size)] = pygame.font.Font(name, size)
+        return font
+
+    def render(self, string, size, colour, name=None):
+        key = (name, size, string, colour)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+        surface = self.font(size, name).render(string, True, colour)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+# shared by everything that draws text
+textCache = TextCache()
@@ -1,11 +1,122 @@
 import pygame
 import os
+import queue
+import threading
 
-def loadImage(path, newSize=None):
-    base_path = os.path.dirname(os.path.dirname(__file__))
-    full_path = os.path.join(base_path, path)
-    image = pygame.image.load(full_path)
+# process-wide sprite cache keyed by (path, size)
+imageCache = {}
+# plain stand-ins shown while the real image is still loading, keyed by (size, colour)
+placeholderCache = {}
+
+def fullPath(path):
+    return os.path.join(os.path.dirname(os.path.dirname(__file__)), path)
+
+def readImage(path, newSize=None):
+    # decode and scale only; safe to run off the main thread
+    image = pygame.image.load(fullPath(path))
     if newSize:
         image = pygame.transform.scale(image, newSize)
     return image
 
+def loadImage(path, newSize=None):
+    key = (path, tuple(newSize) if newSize else None)
+    image = imageCache.get(key)
+    if image is not None:
+        return image
+
+    image = convertImage(readImage(path, newSize))
+    imageCache[key] = image
+    return image
+
+def convertImage(image):
+    # convert to the display pixel format once a window exists (blits are much faster)
+    if pygame.display.get_surface() is None:
+        return image
+    if image.get_flags() & pygame.SRCALPHA:
+        return image.convert_alpha()
+    return image.convert()
+
+def cacheImage(path, newSize, image):
+    """Store an already prepared surface (e.g. an atlas region) in the sprite cache."""
+    imageCache[(path, tuple(newSize) if newSize else None)] = image
+
+def placeholder(size, colour):
+    image = placeholderCache.get((size, colour))
+    if image is None:
+        image = pygame.Surface(size, pygame.SRCALPHA)
+        image.fill((0, 0, 0, 0))
+        pygame.draw.rect(image, colour, image.get_rect(), border_radius=6)
+        placeholderCache[(size, colour)] = image
+    return image
+
+class AssetLoader:
+    # Decodes images on a background thread. The main thread collects them with
+    # poll(), which converts them to the display format and fills the cache.
+    def __init__(self):
+        # while disabled getImage loads synchronously (tools, tests, benchmarks)
+        self.enabled = False
+        self.requested = set()
+        self.pending = 0
+        self.jobs = queue.Queue()
+        self.done = queue.Queue()
+        self.thread = None
+
+    @property
+    def busy(self):
+        return self.pending > 0
+
+    def request(self, path, newSize=None):
+        key = (path, tuple(newSize) if newSize else None)
+        if key in imageCache or key in self.requested:
+            return
+        self.requested.add(key)
+        self.pending += 1
+        self.jobs.put(key)
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="assets", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            path, newSize = key = self.jobs.get()
+            try:
+                image = readImage(path, newSize)
+            except (pygame.error, OSError):
+                image = None
+            self.done.put((key, image))
+
+    def poll(self):
+        """Cache the images decoded since the last call. Returns how many arrived."""
+        arrived = 0
+        while self.pending:
+            try:
+                key, image = self.done.get_nowait()
+            except queue.Empty:
+                return arrived
+            self.pending -= 1
+            if image is not None:
+                imageCache[key] = convertImage(image)
+                arrived += 1
+        return arrived
+
+assetLoader = AssetLoader()
+
+def getImage(path, newSize, colour=(255, 255, 255)):
+    """The cached image, or a placeholder (and a background load) while the loader is enabled."""
+    image = imageCache.get((path, newSize))
+    if image is not None:
+        return image
+    if assetLoader.enabled:
+        assetLoader.request(path, newSize)
+        return placeholder(newSize, colour)
+    return loadImage(path, newSize)
+
+class LazyImage:
+    # class attribute that resolves to its image on first use instead of at import
+    def __init__(self, path, newSize, colour=(255, 255, 255)):
+        self.path = path
+        self.newSize = tuple(newSize)
+        self.colour = colour
+
+    def __get__(self, instance, owner):
+        return getImage(self.path, self.newSize, self.colour)
@@ -0,0 +1,354 @@
+import argparse
+import sys
+import time
+from .history import Move
+from .engine import (Engine, tableauPiles, foundationPiles, stockIndex, wasteIndex, cardSuits,
+                     shuffledDeck, canStackOnTableau, canStackOnFoundation)
+from .replay import isLegalMove
+
+try:
+    import numpy as np
+except ImportError:     # optional: only this simulator needs it
+    np = None
+
+# --------------------vectorized batch playouts---------------------#
+# Plays thousands of deals at once with one greedy strategy, as NumPy arrays:
+#   tableau (games, 7, 20) card ids (52 = none), their lengths and face-down counts,
+#   the stock and waste as one talon in draw order with a pointer (cards before
+#   it are the waste, the top being just before it), and foundation heights per suit.
+# Every step plays one move in each unfinished game, picked by legality masks
+# over all games together. greedyMove/greedyGame are the same strategy on the
+# scalar Engine, used to check the arrays against the game's rules:
+#   python -m files.vecsim --count 200000 --verify 1000
+width = 20              # 6 face-down cards under a run of 13
+talonSize = 24
+# card id of an empty slot
+noCard = 52
+
+if np is not None:
+    tableauColumns = np.arange(7)
+    suitBases = np.arange(0, 52, 13, dtype=np.int16)
+    # suit of each card (4 for noCard, whose foundation never needs anything)
+    suitOf = np.array([card // 13 for card in range(52)] + [4], dtype=np.intp)
+    # the two tops each card may be placed on in the tableau (noCard = an empty
+    # pile, for kings); noCard itself goes nowhere (53, a top no pile has)
+    parents = np.full((2, 53), 53, dtype=np.intp)
+    for card in range(52):
+        tops = [top for top in range(52) if canStackOnTableau(card, top)] or [noCard, noCard]
+        parents[:, card] = tops
+
+def greedyMove(engine, progress):
+    """The strategy's move for `engine`, or None when it gives up.
+
+    In order: a tableau or waste top to its foundation, a whole face-up run
+    that turns over a card onto another tableau pile, the waste top onto the
+    tableau, a draw from the stock, and turning the waste over (only if
+    something besides drawing happened since the last time, `progress`).
+    Sources and targets are tried in pile order.
+    """
+    piles = engine.piles
+    hidden = engine.hidden
+    for source in tuple(tableauPiles) + (wasteIndex,):
+        if piles[source]:
+            card = piles[source][-1]
+            for target in foundationPiles:
+                if canStackOnFoundation(card, piles[target][-1] if piles[target] else None):
+                    down = hidden[source] if source != wasteIndex else 0
+                    return Move(source, target, 1, down > 0 and len(piles[source]) - 1 == down)
+
+    for source in tableauPiles:
+        down = hidden[source]
+        if down and len(piles[source]) > down:
+            for target in tableauPiles:
+                if target != source and canStackOnTableau(
+                        piles[source][down], piles[target][-1] if piles[target] else None):
+                    return Move(source, target, len(piles[source]) - down, True)
+
+    if piles[wasteIndex]:
+        for target in tableauPiles:
+            if canStackOnTableau(piles[wasteIndex][-1], piles[target][-1] if piles[target] else None):
+                return Move(wasteIndex, target, 1, False)
+
+    if piles[stockIndex]:
+        return Move(stockIndex, wasteIndex, 1, False)
+    if piles[wasteIndex] and progress:
+        return Move(wasteIndex, stockIndex, len(piles[wasteIndex]), False)
+    return None
+
+def greedyGame(order, maxMoves=2000, checkRules=False):
+    """Play a deal with greedyMove on the Engine. Returns (won, moves, engine)."""
+    engine = Engine.deal(order)
+    progress = True
+    for moves in range(maxMoves):
+        move = greedyMove(engine, progress)
+        if move is None:
+            return engine.isWon(), moves, engine
+        if checkRules and not isLegalMove(engine, move):
+            raise ValueError(f"illegal greedy move {move}")
+        engine.apply(move)
+        if move.target == stockIndex:
+            progress = False
+        elif move.source != stockIndex:
+            progress = True
+    return engine.isWon(), maxMoves, engine
+
+def engineState(engine):
+    # comparable with VectorGames.state: tableau, face-down counts, talon in draw order
+    # and pointer, foundation heights by suit
+    piles = engine.piles
+    heights = [0] * 4
+    for f in foundationPiles:
+        if piles[f]:
+            heights[cardSuits[piles[f][0]]] = len(piles[f])
+    talon = list(piles[wasteIndex]) + list(reversed(piles[stockIndex]))
+    return (tuple(tuple(piles[t]) for t in tableauPiles), tuple(engine.hidden[:7]),
+            tuple(talon), len(piles[wasteIndex]), tuple(heights))
+
+def dealOrders(start, count):
+    """Deck orders of numbered deals `start` onwards, one row each."""
+    return np.array([shuffledDeck(dealNumber) for dealNumber in range(start, start + count)],
+                    dtype=np.int8)
+
+class VectorGames:
+    # per-game arrays, compacted to the unfinished games as they drop out
+    fields = ("tableau", "lengths", "hidden", "talon", "talonLength", "pointer", "foundations",
+              "progress", "moves")
+
+    def __init__(self, orders):
+        if np is None:
+            raise RuntimeError("the vectorized simulator needs numpy (pip install numpy)")
+        orders = np.asarray(orders, dtype=np.int8)
+        count = len(orders)
+        # where Engine.deal puts each position of the deck order
+        layout = Engine.deal(range(52))
+        self.tableau = np.full((count, 7, width), noCard, dtype=np.int8)
+        for t in tableauPiles:
+            self.tableau[:, t, :t + 1] = orders[:, list(layout.piles[t])]
+        self.lengths = np.tile(np.arange(1, 8, dtype=np.int16), (count, 1))
+        self.hidden = np.tile(np.arange(7, dtype=np.int16), (count, 1))
+        # the stock's top (drawn first) is the end of the engine's stock pile
+        self.talon = orders[:, list(reversed(layout.piles[stockIndex]))].copy()
+        self.talonLength = np.full(count, talonSize, dtype=np.int16)
+        self.pointer = np.zeros(count, dtype=np.int16)
+        self.foundations = np.zeros((count, 4), dtype=np.int16)
+        self.progress = np.ones(count, dtype=bool)
+        self.moves = np.zeros(count, dtype=np.int32)
+
+    def state(self, game):
+        """Position of one game, comparable with engineState."""
+        lengths = self.lengths[game]
+        return (tuple(tuple(int(card) for card in self.tableau[game, t, :lengths[t]]) for t in tableauPiles),
+                tuple(int(down) for down in self.hidden[game]),
+                tuple(int(card) for card in self.talon[game, :self.talonLength[game]]),
+                int(self.pointer[game]), tuple(int(height) for height in self.foundations[game]))
+
+    def won(self):
+        return self.foundations.sum(axis=1) == 52
+
+    def removeWaste(self, rows):
+        # take the waste top out of the talon, closing the gap
+        pointer = self.pointer[rows]
+        cards = self.talon[rows, pointer - 1]
+        columns = np.arange(talonSize)
+        shifted = np.minimum(np.where(columns >= pointer[:, None] - 1, columns + 1, columns), talonSize - 1)
+        talon = np.take_along_axis(self.talon[rows], shifted, axis=1)
+        talon[columns >= self.talonLength[rows, None] - 1] = noCard
+        self.talon[rows] = talon
+        self.talonLength[rows] -= 1
+        self.pointer[rows] -= 1
+        return cards
+
+    def firstTarget(self, topPile, rowStart, cards):
+        # lowest tableau pile `cards` may be placed on, or -1
+        first = topPile.take(rowStart + parents[0].take(cards))
+        second = topPile.take(rowStart + parents[1].take(cards))
+        return np.where((second >= 0) & ((first < 0) | (second < first)), second, first)
+
+    def step(self):
+        """Play one move in every game; returns the mask of games that moved."""
+        lengths = self.lengths
+        hidden = self.hidden
+        tableau = self.tableau
+        pointer = self.pointer
+        index = np.arange(len(lengths))
+        # gathers go through flat offsets, which is faster than broadcast fancy indexing
+        pileStart = (index[:, None] * 7 + tableauColumns) * width
+        rowStart = index[:, None] * 54
+
+        # empty piles have noCard in their first slot
+        slots = tableau.ravel()
+        tops = slots.take(pileStart + np.maximum(lengths - 1, 0))
+        wasteTop = np.where(pointer > 0, self.talon[index, np.maximum(pointer - 1, 0)], noCard)
+
+        # tableau pile each card is the top of (-1 if none), the first empty
+        # pile for noCard and -1 for 53
+        topPile = np.full(len(index) * 54, -1, dtype=np.int8)
+        topPile[rowStart + np.where(tops == noCard, 53, tops)] = tableauColumns
+        empty = lengths == 0
+        topPile[rowStart[:, 0] + noCard] = np.where(empty.any(axis=1), empty.argmax(axis=1), -1)
+        topPile[rowStart[:, 0] + 53] = -1
+
+        # 1. a tableau or waste top to its foundation (the first such pile, the waste last)
+        heights = self.foundations
+        needs = np.where(heights < 13, suitBases + heights, 53)
+        found = topPile.take(rowStart + needs)
+        found = np.where(found >= 0, found, np.where(needs == wasteTop[:, None], 7, 8))
+        foundationSource = found.min(axis=1)
+        toFoundation = foundationSource < 8
+
+        # 2. a whole face-up run that turns over a card, onto another tableau pile
+        lead = slots.take(pileStart + np.minimum(hidden, width - 1))
+        lead = np.where((hidden > 0) & (lengths > hidden), lead, noCard)
+        runTargets = self.firstTarget(topPile, rowStart, lead)
+        runs = runTargets >= 0
+        runSource = runs.argmax(axis=1)
+        runMove = runs[index, runSource]
+        runTarget = runTargets[index, runSource]
+
+        # 3. the waste top onto the tableau
+        wasteTarget = self.firstTarget(topPile, rowStart[:, 0], wasteTop)
+        wasteMove = wasteTarget >= 0
+
+        # 4./5. draw, or turn the waste over if anything happened since the last time
+        canDraw = pointer < self.talonLength
+        canRecycle = (pointer == self.talonLength) & (pointer > 0) & self.progress
+
+        playRun = runMove & ~toFoundation
+        playWaste = wasteMove & ~runMove & ~toFoundation
+        rest = ~(toFoundation | runMove | wasteMove)
+        draw = rest & canDraw
+        recycle = rest & ~canDraw & canRecycle
+
+        fromTableau = toFoundation & (foundationSource < 7)
+        rows = index[fromTableau]
+        if len(rows):
+            piles = foundationSource[fromTableau]
+            top = lengths[rows, piles] - 1
+            cards = tableau[rows, piles, top]
+            tableau[rows, piles, top] = noCard
+            lengths[rows, piles] = top
+            heights[rows, suitOf[cards]] += 1
+        rows = index[toFoundation & (foundationSource == 7)]
+        if len(rows):
+            cards = self.removeWaste(rows)
+            heights[rows, suitOf[cards]] += 1
+
+        rows = index[playRun]
+        if len(rows):
+            sources = runSource[playRun]
+            targets = runTarget[playRun]
+            start = hidden[rows, sources]
+            count = lengths[rows, sources] - start
+            end = lengths[rows, targets]
+            for offset in range(13):
+                moving = count > offset
+                if not moving.any():
+                    break
+                rowsMoving = rows[moving]
+                tableau[rowsMoving, targets[moving], end[moving] + offset] = \
+                    tableau[rowsMoving, sources[moving], start[moving] + offset]
+                tableau[rowsMoving, sources[moving], start[moving] + offset] = noCard
+            lengths[rows, sources] = start
+            lengths[rows, targets] = end + count
+
+        rows = index[playWaste]
+        if len(rows):
+            targets = wasteTarget[playWaste]
+            cards = self.removeWaste(rows)
+            tableau[rows, targets, lengths[rows, targets]] = cards
+            lengths[rows, targets] += 1
+
+        pointer[draw] += 1
+        pointer[recycle] = 0
+
+        # a tableau pile left with only face-down cards turns its top one over
+        hidden -= (lengths == hidden) & (hidden > 0)
+
+        played = toFoundation | playRun | playWaste
+        self.progress[played] = True
+        self.progress[recycle] = False
+        moving = played | draw | recycle
+        self.moves += moving
+        return moving
+
+    def run(self, maxMoves=2000):
+        """Play every game to the end; returns the won mask."""
+        full = {name: getattr(self, name) for name in self.fields}
+        rows = np.arange(len(self.moves))
+        steps = 0
+        while len(rows) and steps < maxMoves:
+            # a finished game never moves again, so it can stay in the arrays
+            # until a quarter of them are finished and they are compacted
+            for name in self.fields:
+                setattr(self, name, full[name][rows])
+            while steps < maxMoves:
+                moving = self.step()
+                steps += 1
+                if moving.sum() * 4 < len(moving) * 3:
+                    break
+            for name in self.fields:
+                full[name][rows] = getattr(self, name)
+            rows = rows[moving]
+        for name in self.fields:
+            setattr(self, name, full[name])
+        return self.won()
+
+def verify(start, count, maxMoves=2000):
+    """Deals whose final position differs between the arrays and the Engine."""
+    games = VectorGames(dealOrders(start, count))
+    games.run(maxMoves)
+    mismatches = []
+    for game in range(count):
+        won, moves, engine = greedyGame(shuffledDeck(start + game), maxMoves, checkRules=True)
+        if (engineState(engine) != games.state(game) or moves != games.moves[game]
+                or won != (games.foundations[game].sum() == 52)):
+            mismatches.append(start + game)
+    return mismatches
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m files.vecsim",
+                                     description="Play numbered deals with a greedy strategy, vectorized.")
+    parser.add_argument("--start", type=int, default=0, help="first deal number")
+    parser.add_argument("--count", type=int, default=100000, help="number of deals")
+    parser.add_argument("--batch", type=int, default=50000, help="games simulated together")
+    parser.add_argument("--max-moves", type=int, default=2000, help="moves per game")
+    parser.add_argument("--verify", type=int, default=0, metavar="N",
+                        help="first check N deals against the scalar Engine")
+    parser.add_argument("--scalar", action="store_true", help="time the scalar Engine instead")
+    return parser.parse_args(argv)
+
+def runSimulation(args):
+    if np is None:
+        sys.exit("the vectorized simulator needs numpy (pip install numpy)")
+    if args.verify:
+        mismatches = verify(args.start, args.verify, args.max_moves)
+        print(f"verified {args.verify} deals against the Engine: {len(mismatches)} mismatches"
+              + (f" (first: deal {mismatches[0]})" if mismatches else ""))
+        if mismatches:
+            sys.exit(1)
+
+    won = moves = 0
+    simulated = 0.0
+    for first in range(args.start, args.start + args.count, args.batch):
+        size = min(args.batch, args.start + args.count - first)
+        if args.scalar:
+            started = time.perf_counter()
+            for dealNumber in range(first, first + size):
+                gameWon, gameMoves, _ = greedyGame(shuffledDeck(dealNumber), args.max_moves)
+                won += gameWon
+                moves += gameMoves
+        else:
+            # dealing is not part of the timing
+            orders = dealOrders(first, size)
+            started = time.perf_counter()
+            games = VectorGames(orders)
+            won += int(games.run(args.max_moves).sum())
+            moves += int(games.moves.sum())
+        simulated += time.perf_counter() - started
+    print(f"{args.count} games, {won} won ({won / max(args.count, 1):.2%}), "
+          f"{moves / max(args.count, 1):.1f} moves per game")
+    print(f"simulated in {simulated:.2f}s ({args.count / max(simulated, 1e-9):.0f} games/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    runSimulation(parseArgs())
@@ -1,15 +1,93 @@
+import time
+started = time.perf_counter()
 import sys
+import argparse
 import pygame
-print("Pygame imported successfully!")
 from files.game import SolitaireGame
+from files.dealdb import DealDatabase, difficultyNames
+from files.utils import assetLoader
+from files.render import backends
+imported = time.perf_counter()
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(description="Solitaire Classic")
+    parser.add_argument("--deal", type=int, default=None, help="play a numbered (seeded) deal")
+    parser.add_argument("--deals", metavar="PATH", help="deal only winnable deals from this database")
+    parser.add_argument("--difficulty", choices=difficultyNames, help="difficulty of database deals")
+    parser.add_argument("--profile", action="store_true", help="show the frame profiler overlay (F3)")
+    parser.add_argument("--trace", metavar="PATH", help="record frames and write a Chrome trace on exit")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print import, init, first-frame and asset load times, then exit")
+    parser.add_argument("--record", metavar="DIR", help="write a replay file per game to this directory")
+    parser.add_argument("--save", metavar="PATH", default="solitaire.sav",
+                        help="save file, written on exit and autosaved (default: solitaire.sav)")
+    parser.add_argument("--no-save", action="store_true", help="do not save or resume the game")
+    parser.add_argument("--new", action="store_true", help="start a new game instead of resuming")
+    parser.add_argument("--stats", metavar="PATH", default="solitaire_stats.db",
+                        help="record game statistics to this SQLite file (default: solitaire_stats.db)")
+    parser.add_argument("--no-stats", action="store_true", help="do not record game statistics")
+    parser.add_argument("--fps", type=int, default=60, help="frame cap (0 = uncapped)")
+    parser.add_argument("--drag-fps", type=int, default=60, help="frame cap while dragging cards")
+    parser.add_argument("--no-idle-wait", action="store_true",
+                        help="keep redrawing at --fps instead of sleeping until input when idle")
+    parser.add_argument("--renderer", choices=backends, default="surface",
+                        help="draw with surface blits or with SDL textures (pygame._sdl2)")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                        help="run the headless game server on host:port or a Unix socket instead")
+    parser.add_argument("--analysis", action="store_true",
+                        help="show Monte Carlo win odds and the best move (F2)")
+    return parser.parse_args(argv)
+
+def startupProfile(game, initialized):
+    # the first frame shows placeholders for anything still loading; keep
+    # drawing until every image is in to time the assets as well (without
+    # sleeping until the next clock tick after each frame)
+    game.idleWait = False
+    game.run_frame()
+    firstFrame = time.perf_counter()
+    while assetLoader.busy:
+        game.run_frame()
+    loaded = time.perf_counter()
+    print(f"import      {(imported - started) * 1000:7.1f} ms")
+    print(f"init        {(initialized - imported) * 1000:7.1f} ms")
+    print(f"first frame {(firstFrame - initialized) * 1000:7.1f} ms  "
+          f"(time to first frame {(firstFrame - started) * 1000:.1f} ms)")
+    print(f"assets      {(loaded - firstFrame) * 1000:7.1f} ms  "
+          f"(all loaded after {(loaded - started) * 1000:.1f} ms)")
 
 def main():
+    args = parseArgs()
+    if args.serve:
+        # no window: sessions are played over the socket (see files/server.py)
+        from files.server import runServer
+        runServer(args.serve)
+        return
+
     # Initialize pygame
     pygame.init()
     pygame.display.set_caption("Solitaire Classic")
     
     # Start the game
-    game = SolitaireGame()
+    database = DealDatabase(args.deals) if args.deals else None
+    difficulty = difficultyNames.index(args.difficulty) if args.difficulty else None
+    # a profiling run leaves no save, statistics or replay behind
+    persist = not args.startup_profile
+    game = SolitaireGame(dealNumber=args.deal, dealDatabase=database, difficulty=difficulty,
+                         replayDir=args.record if persist else None,
+                         savePath=args.save if persist and not args.no_save else None,
+                         resume=not args.new and args.deal is None, analysis=args.analysis,
+                         statsPath=args.stats if persist and not args.no_stats else None,
+                         renderer=args.renderer)
+    game.frameRate = args.fps
+    game.dragFrameRate = args.drag_fps
+    game.idleWait = not args.no_idle_wait
+    game.tracePath = args.trace
+    game.profiler.enabled = args.profile or args.trace is not None
+    if args.profile:
+        game.profilerOverlay.toggle()
+    if args.startup_profile:
+        startupProfile(game, time.perf_counter())
+        game.quit()
     game.run()
 
     # End the game
@@ -19,4 +97,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-